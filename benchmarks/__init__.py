@@ -0,0 +1,178 @@
+"""
+Performance tooling for the API (load tests and micro-benchmarks)
+
+Everything in here is run by hand or in CI, never by the django app itself.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+from posts.vocabulary import VOCABULARY
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def make_text(rng, length):
+    """Returns text of roughly `length` characters built from VOCABULARY"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(VOCABULARY)
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)[:length].strip()
+
+
+def setup_django(test_database=True):
+    """
+    Configures django for benchmarks that run in-process
+
+    Args:
+        test_database (bool): Create a throwaway test database (in-memory for SQLite) instead of using the real one
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmarks')
+    os.environ.setdefault('DJANGO_DEBUG', 'False')
+
+    import django
+    django.setup()
+
+    if test_database:
+        from django.db import connection
+        connection.creation.create_test_db(verbosity=0)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def git_revision():
+    """The current commit (with a -dirty marker), so results can be matched to the code they measured"""
+    try:
+        revision = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = 'unknown'
+    return revision
+
+
+def run_metadata(**config):
+    """Common header for every result file"""
+    return {
+        'revision': git_revision(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': config,
+    }
+
+
+def write_json(data, output):
+    """Writes to a file or to stdout for '-'"""
+    text = json.dumps(data, indent=2, sort_keys=True)
+    if output == '-':
+        print(text)
+    else:
+        Path(output).write_text(text + '\n')
+
+
+def measure(function, repeat, min_time):
+    """
+    Times a callable and returns statistics per call in microseconds
+
+    The loop count is calibrated so that one repetition takes at least `min_time` seconds,
+    timeit switches off the garbage collector while measuring.
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        runs.append(timer.timeit(number) / number * 1e6)
+    runs.sort()
+    quartiles = statistics.quantiles(runs, n=4) if len(runs) > 1 else [runs[0]] * 3
+    return {
+        'loops': number,
+        'min_us': round(runs[0], 3),
+        'median_us': round(statistics.median(runs), 3),
+        'mean_us': round(statistics.mean(runs), 3),
+        'stdev_us': round(statistics.stdev(runs), 3) if len(runs) > 1 else 0.0,
+        'iqr_us': round(quartiles[2] - quartiles[0], 3),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Prints the change of the median against the baseline and returns the names of the regressions"""
+    regressions = []
+    print(f"{'benchmark':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<36} {'-':>12} {current['median_us']:>10.1f}us {'new':>8}")
+            continue
+        change = current['median_us'] / previous['median_us'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<36} {previous['median_us']:>10.1f}us {current['median_us']:>10.1f}us {change:>+8.1%}{flag}")
+    return regressions
+
+
+def run_suite(description, build_benchmarks, add_arguments=None, argv=None):
+    """
+    Command line entry point shared by the in-process benchmark suites
+
+    Args:
+        description (str):          Help text of the command
+        build_benchmarks:           Called with the parsed arguments after django is set up,
+                                    returns a dict of benchmark name -> zero-argument callable
+        add_arguments:              Optional callback adding suite specific arguments to the parser
+    """
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=7, help='measured repetitions per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per repetition')
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument('--compare', help='baseline file written by --save')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown of the median (0.1 = 10%%)')
+    if add_arguments:
+        add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    results = {}
+    for name, function in build_benchmarks(args).items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(function, args.repeat, args.min_time)
+        print(f"{name:<36} {results[name]['median_us']:>12.1f}us  (±{results[name]['iqr_us']:.1f})", file=sys.stderr)
+
+    if args.save:
+        config = {key: value for key, value in vars(args).items() if key not in ('save', 'compare')}
+        write_json({'meta': run_metadata(**config), 'results': results}, args.save)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,325 @@
+"""
+HTTP load generator for the endpoints in posts/urls.py
+
+Runs scripted scenarios against a running server and reports requests per second
+and p50/p95/p99 latency per endpoint as JSON. Only the standard library is used on the client side.
+
+Usage:
+    # start gunicorn on a fresh sqlite database, run every scenario and write the results
+    python -m benchmarks.loadtest --server gunicorn --output loadtest.json
+
+    # run against a server that is already up (start it with DJANGO_THROTTLING=False)
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --scenario guest_read
+
+Runs are comparable across commits as long as the same arguments are used: the request counts,
+the random seed and the seeded database content are fixed, and the warmup requests are not recorded.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from benchmarks import BASE_DIR, make_text, percentile, run_metadata, write_json
+
+PASSWORD = 'loadtest-password'
+
+
+class Client:
+    """A keep-alive HTTP connection that records the latency of every request"""
+    def __init__(self, host, port, timeout=30):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = True
+
+    def request(self, method, path, data=None, token=None, endpoint=None):
+        headers = {'Accept': 'application/json'}
+        body = None
+        if data is not None:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        if token:
+            headers['Authorization'] = f'Token {token}'
+
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            status = response.status
+        except (http.client.HTTPException, OSError):
+            # the server dropped the connection, the next request reconnects
+            self.connection.close()
+            content, status = b'', 0
+        elapsed = time.perf_counter() - start
+
+        if self.recording:
+            name = endpoint or f'{method} {path}'
+            self.samples[name].append(elapsed)
+            if not 200 <= status < 300:
+                self.errors[name] += 1
+
+        try:
+            data = json.loads(content) if content else None
+        except ValueError:
+            # error pages of the server are html
+            data = None
+        return status, data
+
+    def close(self):
+        self.connection.close()
+
+
+class Context:
+    """Users, tokens and posts created during setup and shared by all scenarios"""
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.writer_tokens = []
+        self.login_users = []
+        self.post_ids = []
+        self.burst_size = 5
+
+
+def setup_context(client, args, rng):
+    """Registers the users and seeds the posts the scenarios work with (not recorded)"""
+    client.recording = False
+    context = Context(run_id=f'{int(time.time()) % 100000:05d}')
+
+    def register(name):
+        status, data = client.request('POST', '/api/register/', {'username': name, 'password': PASSWORD})
+        if status != 201:
+            raise SystemExit(f'could not register {name!r} (HTTP {status}): {data}')
+        return data['token']
+
+    for i in range(args.concurrency):
+        context.writer_tokens.append(register(f'lt{context.run_id}w{i}'))
+        name = f'lt{context.run_id}l{i}'
+        register(name)
+        context.login_users.append(name)
+
+    for i in range(args.seed_posts):
+        token = context.writer_tokens[i % len(context.writer_tokens)]
+        status, data = client.request('POST', '/api/posts/', {
+            'title': make_text(rng, 40),
+            'text_content': make_text(rng, rng.randint(200, 2000)),
+        }, token=token)
+        if status != 201:
+            raise SystemExit(f'could not seed posts (HTTP {status}): {data}')
+        context.post_ids.append(data['id'])
+
+    client.recording = True
+    return context
+
+
+### Scenarios
+# each function runs one iteration of the scenario for a single virtual user
+
+def guest_read(client, context, rng):
+    """A guest reading the post list"""
+    client.request('GET', '/api/posts/', endpoint='GET /api/posts/')
+
+
+def author_write(client, context, rng):
+    """An author writing a new post and reading it back"""
+    token = rng.choice(context.writer_tokens)
+    status, data = client.request('POST', '/api/posts/', {
+        'title': make_text(rng, rng.randint(10, 80)),
+        'text_content': make_text(rng, rng.randint(100, 4000)),
+    }, token=token, endpoint='POST /api/posts/')
+    if status == 201:
+        client.request('GET', f"/api/posts/{data['id']}/", endpoint='GET /api/posts/<pk>/')
+
+
+def comment_burst(client, context, rng):
+    """Several comments on the same post in a row, followed by reading the thread"""
+    token = rng.choice(context.writer_tokens)
+    post_id = rng.choice(context.post_ids)
+    path = f'/api/posts/{post_id}/comments/'
+    for _ in range(context.burst_size):
+        client.request('POST', path, {
+            'parent_post': post_id,
+            'text_content': make_text(rng, rng.randint(20, 400)),
+        }, token=token, endpoint='POST /api/posts/<pk>/comments/')
+    client.request('GET', path, endpoint='GET /api/posts/<pk>/comments/')
+
+
+def login_storm(client, context, rng):
+    """Users logging in over and over (every attempt costs a password hash)"""
+    username = rng.choice(context.login_users)
+    client.request('POST', '/api/auth/', {'username': username, 'password': PASSWORD}, endpoint='POST /api/auth/')
+
+
+# the order matters for comparability: reads run before the writes grow the tables
+SCENARIOS = {
+    'guest_read': guest_read,
+    'login_storm': login_storm,
+    'author_write': author_write,
+    'comment_burst': comment_burst,
+}
+
+
+def run_scenario(name, context, args):
+    """Runs `args.iterations` iterations of a scenario spread over `args.concurrency` threads"""
+    scenario = SCENARIOS[name]
+    clients = [Client(args.host, args.port) for _ in range(args.concurrency)]
+    barrier = threading.Barrier(args.concurrency + 1)
+    per_thread = [args.iterations // args.concurrency] * args.concurrency
+    for i in range(args.iterations % args.concurrency):
+        per_thread[i] += 1
+
+    def worker(index):
+        client = clients[index]
+        rng = random.Random(f'{args.seed}-{name}-{index}')
+        client.recording = False
+        for _ in range(args.warmup):
+            scenario(client, context, rng)
+        client.recording = True
+        barrier.wait()
+        for _ in range(per_thread[index]):
+            scenario(client, context, rng)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    # the clock starts once every thread is done warming up
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    for client in clients:
+        client.close()
+    return summarize(clients, duration)
+
+
+def summarize(clients, duration):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    for client in clients:
+        for endpoint, values in client.samples.items():
+            samples[endpoint].extend(values)
+        for endpoint, count in client.errors.items():
+            errors[endpoint] += count
+
+    endpoints = {}
+    for endpoint, values in sorted(samples.items()):
+        values.sort()
+        endpoints[endpoint] = {
+            'requests': len(values),
+            'errors': errors[endpoint],
+            'rps': round(len(values) / duration, 2),
+            'latency_ms': {
+                'p50': round(percentile(values, 50) * 1000, 3),
+                'p95': round(percentile(values, 95) * 1000, 3),
+                'p99': round(percentile(values, 99) * 1000, 3),
+                'mean': round(sum(values) / len(values) * 1000, 3),
+                'max': round(values[-1] * 1000, 3),
+            },
+        }
+
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {
+        'duration_s': round(duration, 3),
+        'requests': total,
+        'errors': sum(errors.values()),
+        'rps': round(total / duration, 2),
+        'endpoints': endpoints,
+    }
+
+
+### Server management
+
+def start_server(args, database_dir):
+    """Starts gunicorn or uvicorn on a freshly migrated database and waits until it accepts connections"""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SECRET_KEY', 'loadtest')
+    # debug mode keeps every query in memory and would distort the results
+    env['DJANGO_DEBUG'] = 'False'
+    # the login_storm and comment_burst scenarios would mostly measure 429 responses
+    env.setdefault('DJANGO_THROTTLING', 'False')
+    if 'DATABASE_URL' not in env:
+        env['DATABASE_URL'] = f'sqlite:///{database_dir}/loadtest.sqlite3'
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=BASE_DIR, env=env, check=True)
+
+    bind = f'{args.host}:{args.port}'
+    if args.server == 'gunicorn':
+        command = ['gunicorn', 'config.wsgi:application', '--bind', bind, '--workers', str(args.workers)]
+    else:
+        command = [
+            'uvicorn', 'config.asgi:application', '--host', args.host, '--port', str(args.port),
+            '--workers', str(args.workers), '--log-level', 'warning',
+        ]
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'{args.server} exited with code {process.returncode}')
+        try:
+            socket.create_connection((args.host, args.port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+
+    process.terminate()
+    raise SystemExit(f'{args.server} did not start listening on {bind}')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help='base url of the server')
+    parser.add_argument('--server', choices=['gunicorn', 'uvicorn'], help='start this server instead of using a running one')
+    parser.add_argument('--workers', type=int, default=2, help='worker processes of the started server')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='scenario to run (repeatable, default: all)')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=400, help='recorded iterations per scenario')
+    parser.add_argument('--warmup', type=int, default=5, help='unrecorded iterations per virtual user before measuring')
+    parser.add_argument('--seed-posts', type=int, default=50, help='posts created before the scenarios run')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the generated content')
+    parser.add_argument('--output', default='-', help="result file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    url = urlsplit(args.url)
+    args.host = url.hostname
+    args.port = url.port or 80
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = args.scenario or list(SCENARIOS)
+
+    with tempfile.TemporaryDirectory() as database_dir:
+        process = start_server(args, database_dir) if args.server else None
+        try:
+            setup_client = Client(args.host, args.port)
+            context = setup_context(setup_client, args, random.Random(args.seed))
+            setup_client.close()
+
+            results = {}
+            for name in scenarios:
+                results[name] = run_scenario(name, context, args)
+                print(f"{name}: {results[name]['rps']} req/s", file=sys.stderr)
+        finally:
+            if process:
+                process.terminate()
+                process.wait()
+
+    config = {key: getattr(args, key) for key in (
+        'server', 'workers', 'concurrency', 'iterations', 'warmup', 'seed_posts', 'seed',
+    )}
+    write_json({'meta': run_metadata(**config), 'scenarios': results}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmarks for posts/renderers.py and posts/parsers.py
+
+Renders and parses the PostList payload (full PostSerializer data) at 100, 1k and 10k posts
+with DRF's JSONRenderer/JSONParser, the orjson based FastJSONRenderer/FastJSONParser and
+the MessagePack pair. The payloads are serialized once up front, so only the encoding is timed.
+
+Usage:
+    python -m benchmarks.renderers --save baseline.json
+    python -m benchmarks.renderers --compare baseline.json --threshold 0.1
+"""
+import io
+import random
+
+from benchmarks import run_suite
+
+SIZES = (100, 1000, 10_000)
+
+
+def build_benchmarks(sizes):
+    """Returns a dict of name -> zero-argument callable"""
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from benchmarks.serializers import seed_database
+    from posts.models import Post
+    from posts.parsers import FastJSONParser, MessagePackParser
+    from posts.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+    from posts.serializers import PostSerializer
+
+    seed_database(random.Random(1), max(sizes))
+    renderers = {'json': JSONRenderer(), 'orjson': FastJSONRenderer()}
+    parsers = {'json': JSONParser(), 'orjson': FastJSONParser()}
+    if orjson is None:
+        del renderers['orjson'], parsers['orjson']
+    if msgpack is not None:
+        renderers['msgpack'] = MessagePackRenderer()
+        parsers['msgpack'] = MessagePackParser()
+
+    benchmarks = {}
+    for size in sizes:
+        data = PostSerializer(Post.objects.order_by('pk')[:size], many=True).data
+        for name, renderer in renderers.items():
+            benchmarks[f'render[{name},{size}]'] = lambda renderer=renderer, data=data: renderer.render(data)
+        for name, parser in parsers.items():
+            body = renderers[name].render(data)
+            benchmarks[f'parse[{name},{size}]'] = (
+                lambda parser=parser, body=body: parser.parse(io.BytesIO(body), parser.media_type, {})
+            )
+    return benchmarks
+
+
+def main(argv=None):
+    def add_arguments(parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='number of posts in the payload')
+
+    run_suite(__doc__, lambda args: build_benchmarks(args.sizes), add_arguments, argv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Micro-benchmarks for posts/serializers.py
+
+Times the ProfanityValidator, django's strip_tags against posts/sanitization.py and
+PostSerializer/CommentSerializer in both directions at 1, 100 and 10k objects.
+The benchmarks run in-process against a throwaway test database.
+
+Usage:
+    python -m benchmarks.serializers --save baseline.json
+    # ... change something ...
+    python -m benchmarks.serializers --compare baseline.json --threshold 0.1
+
+With --compare the exit code is 1 when a benchmark got slower than the threshold allows.
+"""
+import random
+
+from benchmarks import make_text, run_suite
+
+SIZES = (1, 100, 10_000)
+TEXT_LENGTHS = (50, 500, 4000)
+COMMENTS_PER_POST = 2
+
+
+def html_text(rng, length):
+    """Text of roughly `length` characters where every few words are wrapped in tags"""
+    words = make_text(rng, length).split()
+    for i in range(0, len(words), 4):
+        words[i] = f'<b>{words[i]}</b>'
+    return '<p>' + ' '.join(words) + '</p>'
+
+
+def post_payload(rng):
+    return {
+        'title': make_text(rng, rng.randint(10, 80)),
+        'text_content': make_text(rng, rng.randint(100, 4000)),
+        'image': 'https://example.com/image.png',
+    }
+
+
+def seed_database(rng, posts):
+    """Creates the posts (each with a few comments) the serialization benchmarks read"""
+    from django.contrib.auth.models import User
+    from posts.models import Comment, Post, make_excerpt
+
+    author = User.objects.create_user(username='benchmark', password='benchmark')
+    payloads = [post_payload(rng) for _ in range(posts)]
+    created = Post.objects.bulk_create(
+        [Post(author=author, excerpt=make_excerpt(payload['text_content']), **payload) for payload in payloads],
+        batch_size=1000,
+    )
+    Comment.objects.bulk_create(
+        [
+            Comment(parent_post=post, author=author, text_content=make_text(rng, rng.randint(20, 400)))
+            for post in created
+            for _ in range(COMMENTS_PER_POST)
+        ],
+        batch_size=1000,
+    )
+    return created
+
+
+def build_benchmarks(sizes):
+    """Returns a dict of name -> zero-argument callable"""
+    from django.utils.html import strip_tags
+    from posts import sanitization
+    from posts.models import Comment, Post
+    from posts.serializers import CommentSerializer, PostSerializer, PostSummarySerializer, ProfanityValidator
+
+    rng = random.Random(1)
+    posts = seed_database(rng, max(sizes))
+    benchmarks = {}
+
+    validator = ProfanityValidator()
+    for length in TEXT_LENGTHS:
+        text = make_text(rng, length)
+        benchmarks[f'profanity_validator[{length}]'] = lambda text=text: validator(text)
+
+    for length in TEXT_LENGTHS:
+        plain = make_text(rng, length)
+        html = html_text(rng, length)
+        benchmarks[f'strip_tags[plain,{length}]'] = lambda plain=plain: strip_tags(plain)
+        benchmarks[f'strip_tags[html,{length}]'] = lambda html=html: strip_tags(html)
+        benchmarks[f'sanitize[plain,{length}]'] = lambda plain=plain: sanitization.strip_tags(plain)
+        benchmarks[f'sanitize[html,{length}]'] = lambda html=html: sanitization.strip_tags(html)
+
+    def to_internal_value(payload):
+        # to_internal_value sanitizes the data in place, so every call gets a fresh copy
+        PostSerializer().to_internal_value(dict(payload))
+
+    payload = post_payload(rng)
+    payload['text_content'] = html_text(rng, 3000)
+    benchmarks['post_to_internal_value[html]'] = lambda: to_internal_value(payload)
+
+    parent = posts[0]
+    for size in sizes:
+        benchmarks[f'post_serialize[{size}]'] = (
+            lambda size=size: PostSerializer(Post.objects.order_by('pk')[:size], many=True).data
+        )
+        benchmarks[f'post_summary_serialize[{size}]'] = (
+            lambda size=size: PostSummarySerializer(
+                Post.objects.defer('text_content').order_by('pk')[:size], many=True,
+            ).data
+        )
+        post_payloads = [post_payload(rng) for _ in range(size)]
+        benchmarks[f'post_deserialize[{size}]'] = (
+            lambda data=post_payloads: PostSerializer(data=[dict(item) for item in data], many=True).is_valid()
+        )
+
+        benchmarks[f'comment_serialize[{size}]'] = (
+            lambda size=size: CommentSerializer(Comment.objects.order_by('pk')[:size], many=True).data
+        )
+        comment_payloads = [
+            {'parent_post': parent.pk, 'text_content': make_text(rng, rng.randint(20, 400))}
+            for _ in range(size)
+        ]
+        benchmarks[f'comment_deserialize[{size}]'] = (
+            lambda data=comment_payloads: CommentSerializer(data=[dict(item) for item in data], many=True).is_valid()
+        )
+
+    return benchmarks
+
+
+def main(argv=None):
+    def add_arguments(parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='object counts for the serializers')
+
+    run_suite(__doc__, lambda args: build_benchmarks(args.sizes), add_arguments, argv)
+
+
+if __name__ == '__main__':
+    main()
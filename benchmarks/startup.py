@@ -0,0 +1,201 @@
+"""
+Startup benchmark for gunicorn.conf.py
+
+Boots gunicorn again and again on a seeded sqlite database and measures, per mode and endpoint:
+
+    ready_ms            until the socket accepts connections
+    first_response_ms   until the response to a request sent right after that has arrived
+    first_request_ms    latency of the first request once the workers had --settle seconds to boot
+    second_request_ms   latency of the request right after it, for reference
+
+The modes:
+
+    cold        GUNICORN_PRELOAD=False GUNICORN_WARMUP=False, the worker loads everything on demand
+    worker      GUNICORN_PRELOAD=False, every worker loads and warms up the application itself
+    preload     GUNICORN_WARMUP=False, the master loads the application but doesn't warm it up
+    warmup      the shipped configuration, the master loads and warms up the application before forking
+
+Without the preload gunicorn listens right away and the first request waits for the worker to
+load the application, so `ready_ms` alone says little. The private (USS) and proportional (PSS)
+memory of the workers is read from /proc where available.
+
+Usage:
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --mode cold --mode warmup --runs 10
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import BASE_DIR, percentile, run_metadata, write_json
+
+MODES = {
+    'cold': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'False'},
+    'worker': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'True'},
+    'preload': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'False'},
+    'warmup': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'True'},
+}
+
+# method, path and body of the first request, the login fails but still hashes the password
+ENDPOINTS = {
+    'post_list': ('GET', '/api/posts/', None),
+    'post_detail': ('GET', '/api/posts/1/', None),
+    'login': ('POST', '/api/auth/', {'username': 'synthetic_0', 'password': 'wrong password'}),
+}
+
+
+def request(host, port, method, path, data):
+    """Sends one request on a new connection, returns (status, seconds)"""
+    connection = http.client.HTTPConnection(host, port, timeout=60)
+    body = json.dumps(data) if data is not None else None
+    headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+    start = time.perf_counter()
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return response.status, elapsed
+
+
+def worker_memory(pid):
+    """Average private and proportional memory (kB) of the workers of a gunicorn master, None without /proc"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            children = f.read().split()
+        totals = []
+        for child in children:
+            with open(f'/proc/{child}/smaps_rollup') as f:
+                fields = dict(line.split(':', 1) for line in f.read().splitlines()[1:])
+            kilobytes = {name: int(value.split()[0]) for name, value in fields.items()}
+            totals.append((kilobytes['Private_Clean'] + kilobytes['Private_Dirty'], kilobytes['Pss']))
+    except (OSError, KeyError, ValueError):
+        return None
+    if not totals:
+        return None
+    return {
+        'uss_kb': round(sum(uss for uss, _ in totals) / len(totals)),
+        'pss_kb': round(sum(pss for _, pss in totals) / len(totals)),
+    }
+
+
+def wait_until_listening(process, host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with code {process.returncode}')
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.005)
+    process.terminate()
+    raise SystemExit(f'gunicorn did not start listening on {host}:{port}')
+
+
+def boot(args, env, endpoint, settle):
+    """
+    Starts gunicorn, measures the first two requests to `endpoint` and stops it again
+
+    With `settle` the requests are sent that many seconds after the socket accepts connections, when
+    the workers are idle, otherwise right away (like a client of a freshly restarted server).
+    """
+    method, path, data = ENDPOINTS[endpoint]
+    start = time.perf_counter()
+    # no application argument, so the settings of gunicorn.conf.py apply
+    process = subprocess.Popen(
+        ['gunicorn', '--bind', f'{args.host}:{args.port}', '--workers', str(args.workers), '--log-level', 'warning'],
+        cwd=BASE_DIR, env=env,
+    )
+    try:
+        wait_until_listening(process, args.host, args.port)
+        ready = time.perf_counter() - start
+        if settle:
+            time.sleep(settle)
+        first_status, first = request(args.host, args.port, method, path, data)
+        _, second = request(args.host, args.port, method, path, data)
+        memory = worker_memory(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    if first_status >= 500:
+        raise SystemExit(f'{method} {path} failed with HTTP {first_status}')
+    return {'ready': ready, 'first': first, 'second': second, 'memory': memory}
+
+
+def milliseconds(values):
+    values = sorted(values)
+    return {'p50': round(percentile(values, 50) * 1000, 3), 'max': round(values[-1] * 1000, 3)}
+
+
+def measure(args, env, endpoint):
+    restarted = [boot(args, env, endpoint, settle=None) for _ in range(args.runs)]
+    settled = [boot(args, env, endpoint, settle=args.settle) for _ in range(args.runs)]
+    memory = [sample['memory'] for sample in settled if sample['memory']]
+    return {
+        'ready_ms': milliseconds(sample['ready'] for sample in restarted),
+        'first_response_ms': milliseconds(sample['ready'] + sample['first'] for sample in restarted),
+        'first_request_ms': milliseconds(sample['first'] for sample in settled),
+        'second_request_ms': milliseconds(sample['second'] for sample in settled),
+        'worker_memory': memory[-1] if memory else None,
+    }
+
+
+def prepare_database(env):
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], cwd=BASE_DIR, env=env, check=True)
+    subprocess.run(
+        [sys.executable, 'manage.py', 'generate_data', '--users', '20', '--posts', '200', '--comments-per-post', '3'],
+        cwd=BASE_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', action='append', choices=list(MODES), help='mode to measure (repeatable, default: all)')
+    parser.add_argument('--endpoint', action='append', choices=list(ENDPOINTS), help='endpoint of the first request (repeatable, default: all)')
+    parser.add_argument('--runs', type=int, default=3, help='boots per mode, endpoint and measurement')
+    parser.add_argument('--settle', type=float, default=2.0, help='seconds the workers get to boot before the settled requests')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', default='-', help="result file ('-' for stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    modes = args.mode or list(MODES)
+    endpoints = args.endpoint or list(ENDPOINTS)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as database_dir:
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SECRET_KEY', 'startup')
+        env['DJANGO_DEBUG'] = 'False'
+        # the repeated failed logins would be throttled
+        env.setdefault('DJANGO_THROTTLING', 'False')
+        if 'DATABASE_URL' not in env:
+            env['DATABASE_URL'] = f'sqlite:///{database_dir}/startup.sqlite3'
+            prepare_database(env)
+
+        for mode in modes:
+            results[mode] = {}
+            for endpoint in endpoints:
+                result = results[mode][endpoint] = measure(args, {**env, **MODES[mode]}, endpoint)
+                print(
+                    f"{mode} {endpoint}: first response {result['first_response_ms']['p50']}ms after the start, "
+                    f"first request {result['first_request_ms']['p50']}ms once settled",
+                    file=sys.stderr,
+                )
+
+    write_json({'meta': run_metadata(runs=args.runs, settle=args.settle, workers=args.workers), 'modes': results}, args.output)
+
+
+if __name__ == '__main__':
+    main()
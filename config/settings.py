@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from dotenv import load_dotenv
 import dj_database_url
@@ -53,16 +54,22 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'posts.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'posts.middleware.ReadYourWritesMiddleware',
+    'posts.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
 
+# counts the throttles in private memory and resets them for every test
+TEST_RUNNER = 'posts.test_runner.TestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -123,6 +130,65 @@ if 'DATABASE_URL' in os.environ:
         conn_health_checks=True,
     )
 
+# Connection pooling for Postgres (needs psycopg 3 with psycopg_pool, enable with DJANGO_DB_POOL=True)
+# every worker process gets its own pool, so workers * max size has to stay below the server's max_connections.
+# For sync gunicorn workers one connection per thread plus a little headroom is enough.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' and os.environ.get('DJANGO_DB_POOL') == 'True':
+    # pooled connections are handed back after every request, persistent connections would bypass the pool
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    # with pooling django turns this into a connection check whenever the pool hands out a connection
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN_SIZE', 1)),
+        'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX_SIZE', 4)),
+        # seconds a request waits for a free connection before failing
+        'timeout': float(os.environ.get('DJANGO_DB_POOL_TIMEOUT', 10)),
+        # idle connections above min_size are closed after this many seconds
+        'max_idle': float(os.environ.get('DJANGO_DB_POOL_MAX_IDLE', 300)),
+    }
+
+# Production mode for SQLite (enable with DJANGO_SQLITE_PRODUCTION=True)
+# WAL lets readers go on while a writer commits, IMMEDIATE transactions take the write lock up front
+# so two requests can't deadlock while both try to upgrade their read lock
+SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={int(os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA mmap_size={int(os.environ.get('DJANGO_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+        # negative values are KiB instead of pages
+        f"PRAGMA cache_size=-{int(os.environ.get('DJANGO_SQLITE_CACHE_KIB', 64 * 1024))}",
+        'PRAGMA temp_store=MEMORY',
+    ]),
+    'transaction_mode': 'IMMEDIATE',
+    # seconds python's sqlite3 waits for a lock (same as busy_timeout)
+    'timeout': int(os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000,
+}
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and os.environ.get('DJANGO_SQLITE_PRODUCTION') == 'True':
+    DATABASES['default']['OPTIONS'] = SQLITE_PRODUCTION_OPTIONS
+    # keep connections open between requests, so the pragmas only run once per worker
+    DATABASES['default']['CONN_MAX_AGE'] = None
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas (see posts/routers.py)
+# DJANGO_DATABASE_REPLICA_URLS holds space separated database urls, DJANGO_DATABASE_REPLICA_WEIGHTS
+# the matching weights (default 1 each). Locally a second SQLite file can stand in for a replica.
+DATABASE_REPLICAS = {}
+_replica_urls = os.environ.get('DJANGO_DATABASE_REPLICA_URLS', '').split()
+_replica_weights = os.environ.get('DJANGO_DATABASE_REPLICA_WEIGHTS', '').split()
+for _index, _url in enumerate(_replica_urls):
+    _alias = f'replica_{_index}'
+    DATABASES[_alias] = dj_database_url.parse(_url, conn_max_age=500, conn_health_checks=True)
+    # the test runner must not create a separate (empty) database for a replica
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS[_alias] = float(_replica_weights[_index]) if _index < len(_replica_weights) else 1.0
+
+DATABASE_ROUTERS = ['posts.routers.PrimaryReplicaRouter']
+
+# seconds a client's reads stay on the primary after it wrote something
+READ_YOUR_WRITES_SECONDS = int(os.environ.get('DJANGO_READ_YOUR_WRITES_SECONDS', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -166,6 +232,129 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    # orjson based drop-ins for the default JSON renderer and parser (see posts/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'posts.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'posts.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # proxies in front of the app that append to X-Forwarded-For, without one the header is ignored
+    # (otherwise clients could dodge the throttles with a made up header)
+    'NUM_PROXIES': int(os.environ.get('DJANGO_NUM_PROXIES', 0)),
+    # used by the throttles of the login, registration and comment views (see posts/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '20/min',
+        'login_username': '10/min',
+        'register': '10/hour',
+        'comment': '30/min',
+    },
+}
+
+# DJANGO_THROTTLING=False switches the throttles off, e.g. for load tests which log in as fast as they can
+if os.environ.get('DJANGO_THROTTLING') == 'False':
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = dict.fromkeys(REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'])
+
+# Sliding window counters of the throttles, shared by all worker processes on the host
+THROTTLE_STORE = {
+    # memory mapped file, defaults to /dev/shm (or the temp dir) with a name unique to this project
+    'PATH': os.environ.get('DJANGO_THROTTLE_PATH'),
+    # 32 bytes each, a key whose slots are all taken over by other keys starts counting from zero again
+    'SLOTS': 65536,
+    # DJANGO_THROTTLE_SHARED=False counts in private memory of each process,
+    # the test runner (posts/test_runner.py) does that so runs don't throttle each other
+    'SHARED': os.environ.get('DJANGO_THROTTLE_SHARED') != 'False',
+}
+
+# MessagePack for internal service clients, only offered when the msgpack package is installed
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('posts.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('posts.parsers.MessagePackParser')
+
+# On-demand request profiling (see posts/middleware.py)
+# disabled unless a target directory is configured
+PROFILING_DIR = os.environ.get('DJANGO_PROFILING_DIR')
+# seconds a signed X-Profile-Token stays valid
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_TOP_ALLOCATIONS = 25
+
+# comments removed per transaction when purging deleted posts (see posts/deletion.py)
+POST_PURGE_BATCH_SIZE = 1000
+# posts checked per query when repairing the comment counters (see posts/activity.py)
+POST_RECONCILE_BATCH_SIZE = 1000
+# the admin counts up to this many rows exactly, beyond that it uses the table statistics (see posts/admin.py)
+ADMIN_EXACT_COUNT_LIMIT = 10000
+# rows per transaction of the admin's bulk actions
+ADMIN_ACTION_BATCH_SIZE = 1000
+
+# seconds a fresh interpreter may take for django.setup() plus loading the urls (see posts/startup.py),
+# enforced by the test suite and `manage.py startup_profile --check`
+STARTUP_BUDGET = float(os.environ.get('DJANGO_STARTUP_BUDGET', 1.5))
+
+# Compression of API responses (see posts/middleware.py)
+# brotli and zstd are used when the 'brotli'/'zstandard' packages are installed, gzip always works
+API_COMPRESSION = {
+    # smaller bodies fit into a single packet anyway, compressing them only costs time
+    'MIN_SIZE': int(os.environ.get('DJANGO_COMPRESSION_MIN_SIZE', 1024)),
+    'PATH_PREFIXES': ['/api/'],
+    'CONTENT_TYPES': ['application/json', 'application/msgpack', 'application/x-ndjson'],
+    'LEVELS': {'br': 4, 'zstd': 3, 'gzip': 6},
+}
+
+# Server-sent events with new comments (see posts/events.py), every worker process keeps its own clients
+COMMENT_STREAM = {
+    # events buffered per client, a client that falls further behind is disconnected (it resumes with Last-Event-ID)
+    'BUFFER': 64,
+    # comments sent to a resuming client, beyond that it is told to reload them
+    'BACKLOG': 100,
+    # seconds between keep-alive comments, proxies close connections that look idle
+    'HEARTBEAT': 15,
+    # milliseconds clients wait before they reconnect
+    'RETRY': 3000,
+    'MAX_SUBSCRIBERS': int(os.environ.get('DJANGO_STREAM_MAX_SUBSCRIBERS', 10000)),
+    # seconds between the checks for comments written by other worker processes,
+    # 0 turns the poller off for single-process deployments, where every comment is published directly
+    'POLL_INTERVAL': float(os.environ.get('DJANGO_STREAM_POLL_INTERVAL', 2.0)) or None,
+    # how far back these checks look, covers transactions that take a while to commit
+    'POLL_WINDOW': 30,
+}
+
+# posts per GET /api/posts/?ids= request
+MULTI_GET_MAX_IDS = 100
+
+# Delta sync feed of posts and comments (see posts/changes.py)
+CHANGE_FEED = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 1000,
+    # seconds a change is held back, pages end before the first younger one. The log writers are serialized
+    # on PostgreSQL and SQLite, for them this is only a margin
+    'SETTLE': 1.0,
+}
+
+# NDJSON export of posts and comments (see posts/export.py)
+DATA_EXPORT = {
+    # rows fetched per round trip by the database cursors
+    'FETCH_SIZE': 2000,
+    # bytes of NDJSON per written/streamed (and compressed) chunk
+    'CHUNK_BYTES': 64 * 1024,
+}
+
+# Background tasks (see posts/tasks.py)
+TASK_QUEUE = {
+    # threads per worker process that run the in-memory tasks
+    'WORKERS': int(os.environ.get('DJANGO_TASK_WORKERS', 2)),
+    # tasks waiting for a thread, beyond that new tasks run inline in the request instead of piling up
+    'MAX_PENDING': 1000,
+    'MAX_RETRIES': 3,
+    # seconds before the first retry, doubled for every further attempt
+    'RETRY_BACKOFF': 1.0,
+    # persistent tasks that are running longer than this are assumed to be orphaned by a crashed worker
+    'LOCK_TIMEOUT': 300,
+    # run every task synchronously when the transaction commits (for tests and debugging)
+    'EAGER': os.environ.get('DJANGO_TASKS_EAGER') == 'True',
 }
 
 # Static file serving.
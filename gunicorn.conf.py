@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration, gunicorn picks it up when it is started from the project root:
+
+    gunicorn
+    GUNICORN_BIND=0.0.0.0:8000 WEB_CONCURRENCY=8 gunicorn
+
+The application is loaded once in the master and warmed up (posts/warmup.py) before the workers are
+forked, so they start with resolved urls, built serializers and loaded word lists, and share that memory
+copy-on-write. GUNICORN_PRELOAD=False loads the application in every worker instead (each one is then
+warmed up on its own before it accepts requests), GUNICORN_WARMUP=False skips the warmup.
+Command line options like --bind and --workers still take precedence.
+"""
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'config.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+warmup = os.environ.get('GUNICORN_WARMUP', 'True') == 'True'
+
+
+def run_warmup(log):
+    from posts.warmup import warm_up
+
+    timings = warm_up()
+    log.info('Warmup (pid %d): %s', os.getpid(), ', '.join(f'{name} {seconds * 1000:.1f}ms' for name, seconds in timings.items()))
+
+
+def when_ready(server):
+    # runs in the master after the preload, right before the first workers are forked
+    if not preload_app:
+        return
+    if warmup:
+        run_warmup(server.log)
+    # everything allocated so far is never freed, moving it out of the collector's reach keeps the
+    # garbage collections of the workers from writing to (and thereby copying) the shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # without the preload every worker has loaded the application itself
+    if warmup and not preload_app:
+        run_warmup(worker.log)
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from .models import Comment, Post
+
+
+def actual_comment_count():
+    """The number of comments of the outer post, computed from the comment table"""
+    comments = Comment.objects.filter(parent_post=OuterRef('pk')).order_by().values('parent_post')
+    return Coalesce(Subquery(comments.annotate(count=Count('pk')).values('count')), 0)
+
+
+def actual_last_activity():
+    """The timestamp of the newest comment of the outer post, or of the post itself without comments"""
+    comments = Comment.objects.filter(parent_post=OuterRef('pk')).order_by('-timestamp')
+    return Coalesce(Subquery(comments.values('timestamp')[:1]), F('timestamp'))
+
+
+def comment_created(comment):
+    """
+    Updates the counters of the post a new comment belongs to
+
+    Both values are computed by the database in a single UPDATE, so concurrent comments can't overwrite each other.
+    Call it in the same transaction that creates the comment.
+    """
+    Post.all_objects.filter(pk=comment.parent_post_id).update(
+        comment_count=F('comment_count') + 1,
+        last_activity_at=Greatest(F('last_activity_at'), comment.timestamp),
+    )
+
+
+def comment_deleted(comment):
+    """Updates the counters of the post a deleted comment belonged to, call it in the same transaction"""
+    Post.all_objects.filter(pk=comment.parent_post_id).update(
+        # a count that drifted to 0 stays there (reconcile_post_counters repairs it)
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        # the deleted comment may have been the newest one
+        last_activity_at=actual_last_activity(),
+    )
+
+
+def reconcile_post_counters(batch_size=None):
+    """
+    Repairs comment counters that drifted from the comment table (bulk imports, raw SQL, bugs ...)
+
+    Works through the posts in primary key batches, each batch costs one query to find the
+    drifted posts and, only if there are any, one UPDATE which recomputes them in the database.
+    Returns (checked, repaired).
+    """
+    batch_size = batch_size or settings.POST_RECONCILE_BATCH_SIZE
+    checked = repaired = 0
+    last_pk = 0
+    while True:
+        batch = list(Post.all_objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+        drifted = list(
+            Post.all_objects.filter(pk__in=batch)
+            .annotate(actual_count=actual_comment_count(), actual_activity=actual_last_activity())
+            .filter(~Q(comment_count=F('actual_count')) | ~Q(last_activity_at=F('actual_activity')))
+            .values_list('pk', flat=True)
+        )
+        if drifted:
+            repaired += Post.all_objects.filter(pk__in=drifted).update(
+                comment_count=actual_comment_count(), last_activity_at=actual_last_activity(),
+            )
+        checked += len(batch)
+        last_pk = batch[-1]
+    return checked, repaired
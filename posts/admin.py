@@ -1,5 +1,147 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Post, Comment
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
+from .deletion import delete_comments, hide_posts
+from .models import Post, Comment, Task
 
-admin.site.register(Post)
-admin.site.register(Comment)
\ No newline at end of file
+
+def estimated_count(model, using):
+    """
+    The number of rows of the model's table according to the database statistics, None without any
+
+    It counts the table, not the default manager: for posts that includes the deleted ones that
+    VisiblePostManager hides until they are purged.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [connection.ops.quote_name(table)])
+            row = cursor.fetchone()
+            # -1 until the table was vacuumed or analyzed for the first time
+            return int(row[0]) if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            # only exists once ANALYZE ran
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            row = cursor.fetchone()
+            # the first number of every index's stat is the row count of the table
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+def pk_batches(queryset, batch_size):
+    """The primary keys of a queryset in ascending batches, each one read by a keyset query"""
+    keys = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        batch = list((keys if last_pk is None else keys.filter(pk__gt=last_pk))[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for the changelists of tables with millions of rows
+
+    An exact COUNT(*) has to read the whole table. The unfiltered changelist uses the row estimate of the
+    table statistics once the table is larger than ADMIN_EXACT_COUNT_LIMIT (for posts the estimate
+    includes the deleted ones that are still waiting for their purge), a filtered or searched one counts
+    up to that many rows (narrow the filter to get further).
+    A page is loaded in two steps (a deferred join): the primary keys of the page, then just the rows
+    of those keys with their joins. This is still OFFSET pagination: a deep page scans the index entries
+    of all the earlier pages, it just doesn't read their rows.
+    """
+    def __init__(self, *args, filtered=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.filtered = filtered
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not self.filtered:
+            estimate = estimated_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return self.object_list.order_by()[:limit].count()
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        keys = list(self.object_list.values_list('pk', flat=True)[bottom:top])
+        # the ordering of the changelist still applies, so the rows come back in the order of the keys
+        return self._get_page(self.object_list.filter(pk__in=keys), number, self)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for big tables: estimated counts, primary key order (an index) and batched actions
+
+    Subclasses join the related objects they display with list_select_related and use raw_id_fields
+    for foreign keys, a select box would load every user or post.
+    """
+    paginator = EstimatedCountPaginator
+    # the "N total" link runs a second, exact COUNT(*) on every page view
+    show_full_result_count = False
+    ordering = ('-pk',)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        filtered = queryset.query.where != self.get_queryset(request).query.where
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, filtered=filtered)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # its confirmation page collects every related object, e.g. all comments of the selected posts
+        actions.pop('delete_selected', None)
+        return actions
+
+    def run_in_batches(self, request, queryset, operation, message):
+        """Applies `operation` to the primary keys of the queryset in ADMIN_ACTION_BATCH_SIZE transactions"""
+        done = sum(operation(batch) for batch in pk_batches(queryset, settings.ADMIN_ACTION_BATCH_SIZE))
+        self.message_user(request, message % done)
+
+
+@admin.register(Post)
+class PostAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'author', 'timestamp', 'comment_count', 'last_activity_at')
+    list_select_related = ('author',)
+    raw_id_fields = ('author',)
+    # exact matches use the unique index of the username, a partial match would scan the users
+    search_fields = ('=author__username',)
+    readonly_fields = ('excerpt', 'comment_count', 'last_activity_at')
+    actions = ('hide_selected',)
+
+    @admin.action(description='Delete the selected posts (their comments are purged in the background)')
+    def hide_selected(self, request, queryset):
+        self.run_in_batches(request, queryset, hide_posts, 'Deleted %d posts.')
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    # the post id instead of the post, which would load its text for every row
+    list_display = ('id', 'text', 'author', 'parent_post_id', 'timestamp')
+    list_select_related = ('author',)
+    raw_id_fields = ('author', 'parent_post')
+    search_fields = ('=author__username',)
+    actions = ('delete_selected_comments',)
+
+    @admin.display(description='Text')
+    def text(self, comment):
+        return Truncator(comment.text_content).chars(80)
+
+    @admin.action(description='Delete the selected comments')
+    def delete_selected_comments(self, request, queryset):
+        self.run_in_batches(request, queryset, delete_comments, 'Deleted %d comments.')
+
+
+admin.site.register(Task)
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.db.models.functions import Now
+
+from .models import Change, Comment, Post
+from .serializers import CommentSerializer, PostChangeSerializer
+
+
+def changes_since(since, limit):
+    """
+    Returns the changes after the token `since` as (entries, next token, has_more)
+
+    Every post or comment appears at most once per page, with its current data, even when it changed
+    several times. Updates of objects that are gone by now are reported as deletes.
+    The token is the id of the log entry. The writers of the log are serialized (see Change), so the
+    entries commit in id order. On top of that a page ends before the first change younger than
+    CHANGE_FEED['SETTLE'] seconds (by the clock of the database), the client gets it with its next sync.
+    """
+    settled = ExpressionWrapper(
+        Q(created_at__lte=Now() - timedelta(seconds=settings.CHANGE_FEED['SETTLE'])), output_field=BooleanField(),
+    )
+    rows = list(Change.objects.filter(pk__gt=since).annotate(settled=settled).order_by('pk')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    for index, row in enumerate(rows):
+        # cut instead of filtered out, the token must not move past a change the client hasn't seen
+        if not row.settled:
+            rows, has_more = rows[:index], False
+            break
+
+    latest = {}
+    for row in rows:
+        # moved to the end, so the objects are listed in the order of their last change
+        latest.pop((row.kind, row.object_id), None)
+        latest[row.kind, row.object_id] = row
+
+    def current(kind):
+        return [object_id for (row_kind, object_id), row in latest.items() if row_kind == kind and row.action != Change.DELETE]
+
+    posts = Post.objects.select_related('author').in_bulk(current(Change.POST))
+    comments = (
+        Comment.objects.select_related('author')
+        # the comments of a deleted post are gone for the client, even before they are purged
+        .filter(parent_post__deleted_at__isnull=True)
+        .in_bulk(current(Change.COMMENT))
+    )
+    serializers = {Change.POST: (posts, PostChangeSerializer), Change.COMMENT: (comments, CommentSerializer)}
+
+    entries = []
+    for (kind, object_id), row in latest.items():
+        objects, serializer_class = serializers[kind]
+        instance = objects.get(object_id)
+        entries.append({
+            'change': row.pk,
+            'type': kind,
+            'id': object_id,
+            'action': row.action if instance is not None else Change.DELETE,
+            'data': serializer_class(instance).data if instance is not None else None,
+        })
+    return entries, rows[-1].pk if rows else since, has_more
@@ -0,0 +1,115 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        # wbits=31 writes a gzip header and trailer instead of a raw zlib stream
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+    def compress_chunk(self, compressor, data):
+        # Z_SYNC_FLUSH pushes every chunk out right away, so streaming clients aren't kept waiting
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, compressor):
+        return compressor.flush()
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        return brotli.Compressor(quality=self.level)
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+    def compress_chunk(self, compressor, data):
+        return compressor.process(data) + compressor.flush()
+
+    def finish(self, compressor):
+        return compressor.finish()
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressor(self):
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def compress_chunk(self, compressor, data):
+        return compressor.compress(data) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, compressor):
+        return compressor.flush()
+
+
+def available_codecs(levels):
+    """
+    Returns the usable codecs by encoding name, in the order the server prefers them
+
+    brotli and zstd are optional dependencies, gzip is always there.
+    """
+    codecs = {}
+    if brotli is not None:
+        codecs['br'] = BrotliCodec(levels.get('br', 4))
+    if zstandard is not None:
+        codecs['zstd'] = ZstdCodec(levels.get('zstd', 3))
+    codecs['gzip'] = GzipCodec(levels.get('gzip', 6))
+    return codecs
+
+
+def choose_encoding(accept_encoding, codecs):
+    """
+    Picks the encoding with the highest q-value from an Accept-Encoding header
+
+    Ties are broken by the order of `codecs`. Returns None when the client accepts none of them.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    best, best_quality = None, 0.0
+    for name in codecs:
+        quality = weights.get(name, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
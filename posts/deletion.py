@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .activity import actual_comment_count, actual_last_activity
+from .models import Change, Comment, Post
+from .tasks import task
+
+
+def hide_post(post):
+    """
+    Deletes a post from the user's point of view
+
+    The post disappears from every read at once, its comments (and then the row itself)
+    are removed in small batches by a background task once the transaction commits.
+    purge_deleted_posts() picks up whatever that task didn't get to.
+    """
+    post.deleted_at = timezone.now()
+    with transaction.atomic():
+        Post.all_objects.filter(pk=post.pk).update(deleted_at=post.deleted_at)
+        Change.record(post, Change.DELETE)
+        purge_post.enqueue(post.pk, persistent=True)
+
+
+def hide_posts(post_ids):
+    """hide_post() for many posts in one transaction, returns the number of posts that were still visible"""
+    deleted_at = timezone.now()
+    with transaction.atomic():
+        post_ids = list(Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True))
+        Post.all_objects.filter(pk__in=post_ids).update(deleted_at=deleted_at)
+        Change.bulk_record(Change.POST, post_ids, Change.DELETE)
+        for pk in post_ids:
+            purge_post.enqueue(pk, persistent=True)
+    return len(post_ids)
+
+
+def delete_comments(comment_ids):
+    """
+    Deletes many comments in one transaction, returns the number of deleted comments
+
+    Logs the deletions like Comment.delete() and recomputes the counters of the affected posts
+    with one UPDATE instead of one per comment.
+    """
+    with transaction.atomic():
+        comments = list(Comment.objects.filter(pk__in=comment_ids).values_list('pk', 'parent_post_id'))
+        Comment.objects.filter(pk__in=[pk for pk, _ in comments]).delete()
+        Post.all_objects.filter(pk__in={post_id for _, post_id in comments}).update(
+            comment_count=actual_comment_count(), last_activity_at=actual_last_activity(),
+        )
+        # last, the log stays locked until the commit
+        Change.bulk_record(Change.COMMENT, [pk for pk, _ in comments], Change.DELETE)
+    return len(comments)
+
+
+@task
+def purge_post(post_id, batch_size=None):
+    """
+    Removes the comments of a hidden post in primary key batches and then the post itself
+
+    Every batch is its own short transaction, so a thread with thousands of comments
+    never holds the write lock for long. Returns the number of removed comments.
+    """
+    batch_size = batch_size or settings.POST_PURGE_BATCH_SIZE
+    removed = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Comment.objects.filter(parent_post_id=post_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            removed += Comment.objects.filter(pk__in=batch).delete()[0]
+
+    # the condition protects against purging a post that was never hidden
+    Post.all_objects.filter(pk=post_id, deleted_at__isnull=False).delete()
+    return removed
+
+
+def purge_deleted_posts(batch_size=None):
+    """Purges every hidden post, returns (posts, comments) removed"""
+    post_ids = list(Post.all_objects.filter(deleted_at__isnull=False).order_by('pk').values_list('pk', flat=True))
+    comments = sum(purge_post(post_id, batch_size) for post_id in post_ids)
+    return len(post_ids), comments
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Comment
+from .renderers import FastJSONRenderer
+from .serializers import CommentSerializer
+
+logger = logging.getLogger(__name__)
+
+# put into the buffer of a client that fell too far behind, it is disconnected once it gets there
+EVICTED = object()
+
+
+def format_event(comment_id, data, event='comment'):
+    """A server-sent event, the id lets the client resume with Last-Event-ID"""
+    lines = [f'id: {comment_id}'] if comment_id is not None else []
+    return '\n'.join(lines + [f'event: {event}', f'data: {data}']) + '\n\n'
+
+
+def comment_event(comment):
+    return format_event(comment.pk, FastJSONRenderer().render(CommentSerializer(comment).data).decode())
+
+
+class Subscriber:
+    """A connected client: a bounded buffer of events, filled on the event loop the client waits on"""
+    def __init__(self, post_id, size):
+        self.post_id = post_id
+        self.queue = asyncio.Queue(size)
+        self.loop = asyncio.get_running_loop()
+        self.evicted = False
+
+    def deliver(self, event):
+        if self.evicted:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # a slow client must not hold back the others or make the buffer grow without bounds,
+            # it is dropped and catches up with Last-Event-ID when it reconnects
+            self.evicted = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(EVICTED)
+
+
+class CommentHub:
+    """
+    Fans new comments out to the stream clients of this worker process
+
+    publish_comment() is called from any thread once a comment is committed, the events are handed to
+    every subscriber of the post on its event loop. An idle subscriber is a parked coroutine and a
+    small queue, so a worker can hold thousands of them.
+    Comments written by other worker processes are picked up by a single poller per process, which
+    looks for new comments on the posts that have subscribers every POLL_INTERVAL seconds.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        # comment id -> time it was published, so the poller doesn't publish it again
+        self.published = {}
+        self.poller = None
+
+    def count(self):
+        with self.lock:
+            return sum(len(subscribers) for subscribers in self.subscribers.values())
+
+    def subscribe(self, post_id):
+        """Registers a client of the running event loop"""
+        subscriber = Subscriber(post_id, settings.COMMENT_STREAM['BUFFER'])
+        with self.lock:
+            self.subscribers[post_id].add(subscriber)
+        self._start_poller(subscriber.loop)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(subscriber.post_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[subscriber.post_id]
+
+    def publish_comment(self, comment):
+        with self.lock:
+            subscribers = list(self.subscribers.get(comment.parent_post_id, ()))
+            if not subscribers or comment.pk in self.published:
+                return
+            if settings.COMMENT_STREAM['POLL_INTERVAL']:
+                self.published[comment.pk] = time.monotonic()
+        # serialized once, no matter how many clients are waiting
+        event = (comment.pk, comment_event(comment))
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # the loop is closed, the subscriber is gone
+                self.unsubscribe(subscriber)
+
+    def poll(self):
+        """Publishes the comments of the last POLL_WINDOW seconds on posts with subscribers that weren't published yet"""
+        window = settings.COMMENT_STREAM['POLL_WINDOW']
+        with self.lock:
+            post_ids = list(self.subscribers)
+            # older entries can't show up in the window anymore
+            expired = time.monotonic() - 2 * window
+            self.published = {pk: published for pk, published in self.published.items() if published > expired}
+        if not post_ids:
+            return
+        since = timezone.now() - timedelta(seconds=window)
+        comments = Comment.objects.filter(parent_post_id__in=post_ids, timestamp__gte=since).select_related('author')
+        for comment in comments.order_by('id'):
+            self.publish_comment(comment)
+
+    def _start_poller(self, loop):
+        if not settings.COMMENT_STREAM['POLL_INTERVAL']:
+            return
+        with self.lock:
+            if self.poller is not None and not self.poller.done() and self.poller.get_loop() is loop:
+                return
+            self.poller = loop.create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(settings.COMMENT_STREAM['POLL_INTERVAL'])
+            with self.lock:
+                if not self.subscribers:
+                    # the next subscriber starts a new one
+                    self.poller = None
+                    return
+            try:
+                await sync_to_async(self._poll_with_fresh_connection)()
+            except Exception:
+                logger.exception('Polling for new comments failed')
+
+    def _poll_with_fresh_connection(self):
+        # like a request: connections that are broken or past CONN_MAX_AGE are replaced
+        close_old_connections()
+        try:
+            self.poll()
+        finally:
+            close_old_connections()
+
+
+hub = CommentHub()
+
+
+def latest_comment_id(post_id):
+    """The id of the newest comment of a post, 0 without comments (served by the comment_post_idx index)"""
+    return Comment.objects.filter(parent_post_id=post_id).aggregate(latest=Max('id'))['latest'] or 0
+
+
+def missed_comments(post_id, last_event_id, limit):
+    """The events of the comments after `last_event_id`, None when more than `limit` were missed"""
+    comments = list(
+        Comment.objects.filter(parent_post_id=post_id, pk__gt=last_event_id)
+        .select_related('author').order_by('id')[:limit + 1]
+    )
+    if len(comments) > limit:
+        return None
+    return [(comment.pk, comment_event(comment)) for comment in comments]
+
+
+async def comment_stream(post_id, last_event_id=None):
+    """
+    The body of the event stream of a post: the missed comments (with `last_event_id`), then the ones
+    created after the client connected
+
+    Sends a keep-alive comment every HEARTBEAT seconds, ends with an `evicted` event when the client
+    fell more than BUFFER events behind and with a `reset` event up front when it missed more than
+    BACKLOG comments (the client should reload the comments and reconnect without Last-Event-ID).
+    """
+    config = settings.COMMENT_STREAM
+    subscriber = hub.subscribe(post_id)
+    try:
+        # subscribed before the backlog or the cutoff is read, so nothing committed in between is lost.
+        # the poller publishes everything of the last POLL_WINDOW seconds that this worker hasn't published yet,
+        # the cutoff keeps the comments the client already has out. Clients pass the newest id they loaded,
+        # without one the newest comment at connect time is all we can go by
+        backlog = None
+        if last_event_id is not None:
+            backlog = await sync_to_async(missed_comments)(post_id, last_event_id, config['BACKLOG'])
+        cutoff = last_event_id if backlog is not None else await sync_to_async(latest_comment_id)(post_id)
+
+        # tells EventSource clients how many milliseconds to wait before they reconnect
+        yield f"retry: {config['RETRY']}\n\n"
+
+        sent = set()
+        if last_event_id is not None and backlog is None:
+            yield format_event(None, '{"detail": "Too many missed comments, reload them"}', event='reset')
+        for comment_id, event in backlog or ():
+            sent.add(comment_id)
+            yield event
+
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), config['HEARTBEAT'])
+            except asyncio.TimeoutError:
+                # proxies close connections that look idle
+                yield ': keep-alive\n\n'
+                continue
+            if item is EVICTED:
+                yield format_event(None, '{"detail": "Too slow, reconnect with Last-Event-ID"}', event='evicted')
+                return
+            comment_id, event = item
+            if comment_id > cutoff and comment_id not in sent:
+                yield event
+    finally:
+        hub.unsubscribe(subscriber)
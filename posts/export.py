@@ -0,0 +1,104 @@
+from datetime import datetime, time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Comment, Post
+from .renderers import FastJSONRenderer
+
+POST_FIELDS = ('id', 'title', 'text_content', 'excerpt', 'timestamp', 'image', 'comment_count', 'last_activity_at')
+COMMENT_FIELDS = ('id', 'text_content', 'timestamp')
+
+
+def parse_since(value):
+    """An ISO date or datetime (naive ones are in the current time zone), raises ValueError"""
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'{value!r} is not an ISO date or datetime')
+        since = datetime.combine(day, time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_records(since=None, fetch_size=None):
+    """
+    Yields every visible post as a dict with its author's username and its comments, in primary key order
+
+    With `since` only the posts with activity (creation or a new comment) at or after that time are exported.
+    Posts and comments are read in key order by two iterators (server-side cursors on postgres) and
+    merged, so the memory use doesn't grow with the tables, only with the comments of a single post.
+    """
+    fetch_size = fetch_size or settings.DATA_EXPORT['FETCH_SIZE']
+    posts = Post.objects.all()
+    # the comments of hidden posts are skipped, even before they are purged
+    comments = Comment.objects.filter(parent_post__deleted_at__isnull=True)
+    if since is not None:
+        posts = posts.filter(last_activity_at__gte=since)
+        comments = comments.filter(parent_post__last_activity_at__gte=since)
+
+    post_rows = posts.order_by('pk').values(*POST_FIELDS, 'author__username').iterator(fetch_size)
+    # served by the comment_post_idx index
+    comment_rows = (
+        comments.order_by('parent_post_id', 'pk')
+        .values(*COMMENT_FIELDS, 'parent_post_id', 'author__username')
+        .iterator(fetch_size)
+    )
+
+    comment = next(comment_rows, None)
+    for post in post_rows:
+        post['author'] = post.pop('author__username')
+        post['comments'] = []
+        # the two queries don't share a snapshot, comments of posts that aren't in the export are skipped
+        while comment is not None and comment['parent_post_id'] < post['id']:
+            comment = next(comment_rows, None)
+        while comment is not None and comment['parent_post_id'] == post['id']:
+            post['comments'].append({
+                'id': comment['id'],
+                'author': comment['author__username'],
+                'text_content': comment['text_content'],
+                'timestamp': comment['timestamp'],
+            })
+            comment = next(comment_rows, None)
+        yield post
+
+
+def ndjson_chunks(records, codec=None):
+    """
+    Encodes the records as NDJSON, yields chunks of about DATA_EXPORT['CHUNK_BYTES']
+
+    With a codec from posts/compression.py the chunks are compressed, each one is flushed so a
+    reader can decompress everything that has arrived so far.
+    """
+    renderer = FastJSONRenderer()
+    chunk_bytes = settings.DATA_EXPORT['CHUNK_BYTES']
+    compressor = codec.compressor() if codec else None
+    lines, size = [], 0
+
+    def flush():
+        data = b''.join(lines)
+        lines.clear()
+        return codec.compress_chunk(compressor, data) if codec else data
+
+    for record in records:
+        line = renderer.render(record) + b'\n'
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield flush()
+            size = 0
+    if lines:
+        yield flush()
+    if codec:
+        yield codec.finish(compressor)
+
+
+async def async_chunks(chunks):
+    """Steps through a synchronous chunk generator in the sync thread, for streaming responses under ASGI"""
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
@@ -0,0 +1,202 @@
+import gzip
+import io
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Change, Comment, ImportProgress, Post, make_excerpt
+from .serializers import CommentImportSerializer, PostImportSerializer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def open_input(path):
+    """Opens an NDJSON file for reading bytes, .gz and .zst files are decompressed on the fly"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise ValueError('zstandard is not installed')
+        # zstandard.open()'s reader can't be iterated by line, the buffered wrapper can
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader)
+    return open(path, 'rb')
+
+
+def read_batches(f, batch_size, skip=0):
+    """Yields lists of (line number, line), the numbers start at 1, the first `skip` lines and blank ones are left out"""
+    batch = []
+    for number, line in enumerate(f, 1):
+        if number <= skip or not line.strip():
+            continue
+        batch.append((number, line))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reject(number, comment, errors, data):
+    """A line of the rejects file, `comment` is the index of a rejected comment or None for the whole post"""
+    return {'line': number, 'comment': comment, 'errors': errors, 'data': data}
+
+
+def validate_line(number, line):
+    """
+    Parses and validates a post with its comments like the API would, without touching the database
+
+    Returns (validated post or None, [(index, validated comment)], rejects). An invalid comment is
+    rejected on its own, an invalid post with all of its comments.
+    """
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        return None, [], [reject(number, None, {'line': [f'Invalid JSON: {e}']}, line.decode(errors='replace'))]
+    if not isinstance(data, dict) or not isinstance(data.get('comments', []), list):
+        return None, [], [reject(number, None, {'line': ['Expected a post object with a list of comments.']}, data)]
+
+    comments_data = data.pop('comments', [])
+    post = PostImportSerializer(data=data)
+    if not post.is_valid():
+        return None, [], [reject(number, None, post.errors, data)]
+
+    comments, rejects = [], []
+    for index, comment_data in enumerate(comments_data):
+        if not isinstance(comment_data, dict):
+            rejects.append(reject(number, index, {'comment': ['Expected a comment object.']}, comment_data))
+            continue
+        comment = CommentImportSerializer(data=comment_data)
+        if comment.is_valid():
+            comments.append((index, comment.validated_data))
+        else:
+            rejects.append(reject(number, index, comment.errors, comment_data))
+    return post.validated_data, comments, rejects
+
+
+def validate_batch(batch):
+    """Runs in the worker processes, the results are plain data so they can be sent back"""
+    results = []
+    for number, line in batch:
+        post, comments, rejects = validate_line(number, line)
+        # plain dicts, lists and strings instead of the serializers' ReturnDicts and ErrorDetails
+        results.append((
+            number,
+            dict(post) if post is not None else None,
+            [(index, dict(comment)) for index, comment in comments],
+            json.loads(json.dumps(rejects)),
+        ))
+    return results
+
+
+def validated_batches(batches, workers):
+    """
+    Validates the batches in a pool of `workers` processes (in this one with 0), yields the results in input order
+
+    The sanitizer and the profanity filter are CPU bound, the inserts are not, so only the validation
+    is spread over processes. At most two batches per worker are in flight to keep the memory constant.
+    """
+    if not workers:
+        for batch in batches:
+            yield validate_batch(batch)
+        return
+
+    # spawned instead of forked, a forked worker would inherit (and on exit close) our database connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=django.setup) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(validate_batch, batch))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def resolve_authors(usernames, user_ids):
+    """Adds the ids of the `usernames` to the username -> id cache, None for unknown ones"""
+    missing = set(usernames) - user_ids.keys()
+    if missing:
+        user_ids.update(dict.fromkeys(missing))
+        user_ids.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+
+
+def build_batch(results, user_ids):
+    """
+    Turns the validated posts and comments of a batch into unsaved Post and Comment objects
+
+    The authors are looked up by username (`user_ids` caches them between batches), posts and comments of
+    unknown users are rejected. The excerpts and counters are filled in like the API would.
+    Returns (posts, comments, rejects).
+    """
+    resolve_authors(
+        [post['author'] for _, post, _, _ in results if post is not None]
+        + [comment['author'] for _, _, comments, _ in results for _, comment in comments],
+        user_ids,
+    )
+    now = timezone.now()
+    posts, comments, rejects = [], [], []
+    for number, post_data, comments_data, line_rejects in results:
+        rejects.extend(line_rejects)
+        if post_data is None:
+            continue
+        if user_ids[post_data['author']] is None:
+            rejects.append(reject(number, None, {'author': ['Unknown user.']}, post_data['author']))
+            continue
+        post = Post(
+            author_id=user_ids[post_data['author']],
+            title=post_data['title'],
+            text_content=post_data['text_content'],
+            # bulk_create skips Post.save(), which normally fills the excerpt
+            excerpt=make_excerpt(post_data['text_content']),
+            image=post_data.get('image'),
+            timestamp=post_data.get('timestamp') or now,
+        )
+        post_comments = []
+        for index, comment_data in comments_data:
+            if user_ids[comment_data['author']] is None:
+                rejects.append(reject(number, index, {'author': ['Unknown user.']}, comment_data['author']))
+                continue
+            # bulk_create fills in the primary key of the post before the comments are inserted
+            post_comments.append(Comment(
+                parent_post=post,
+                author_id=user_ids[comment_data['author']],
+                text_content=comment_data['text_content'],
+                timestamp=comment_data.get('timestamp') or now,
+            ))
+        post.comment_count = len(post_comments)
+        post.last_activity_at = max((comment.timestamp for comment in post_comments), default=post.timestamp)
+        posts.append(post)
+        comments.extend(post_comments)
+
+    return posts, comments, rejects
+
+
+def insert_batch(posts, comments, path, line):
+    """
+    Inserts the posts and comments of a batch with bulk_create and moves the progress of the import of
+    `path` to `line`, all in one transaction: an interrupted import never inserts a batch twice
+
+    The timestamps of the objects are only kept inside explicit_timestamps() of the import command.
+    """
+    with transaction.atomic():
+        Post.objects.bulk_create(posts)
+        Comment.objects.bulk_create(comments)
+        ImportProgress.objects.update_or_create(path=path, defaults={'line': line})
+        # so sync clients pick up the imported content (see posts/changes.py), last since it locks the log
+        Change.bulk_record(Change.POST, [post.pk for post in posts], Change.CREATE)
+        Change.bulk_record(Change.COMMENT, [comment.pk for comment in comments], Change.CREATE)
+
+
+def imported_lines(path):
+    """The number of the last imported line of `path`, 0 for a new file"""
+    return ImportProgress.objects.filter(path=path).values_list('line', flat=True).first() or 0
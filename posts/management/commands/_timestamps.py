@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Lets bulk_create keep the timestamps we set instead of overwriting them with auto_now_add
+
+    Only for generate_data and import_posts (commands skip modules starting with an underscore): it
+    switches auto_now_add off on the model fields of the whole process, in a server that would
+    affect every request running at the same time.
+    """
+    fields = [model._meta.get_field('timestamp') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
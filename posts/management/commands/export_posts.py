@@ -0,0 +1,64 @@
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.compression import available_codecs
+from posts.export import export_records, ndjson_chunks, parse_since
+
+EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd', '.br': 'br'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes every visible post with its comments and author usernames as NDJSON, one post per line. '
+        'Reads the tables in key order with constant memory, use it for snapshots instead of paging the API. '
+        'With --since only the posts with activity since then are exported, edits and deletions are in /api/changes/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="file to write ('-' for stdout)")
+        parser.add_argument(
+            '--compress', choices=['none', 'gzip', 'zstd', 'br'],
+            help='compression (default: from the extension of --output, .gz, .zst or .br)',
+        )
+        parser.add_argument('--since', help='ISO date or datetime, only export posts created or commented on since then')
+        parser.add_argument('--fetch-size', type=int, help="rows per database round trip (default: DATA_EXPORT['FETCH_SIZE'])")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        compress = options['compress']
+        if compress is None:
+            compress = next((name for extension, name in EXTENSIONS.items() if output.endswith(extension)), 'none')
+        codec = None
+        if compress != 'none':
+            codec = available_codecs(settings.API_COMPRESSION['LEVELS']).get(compress)
+            if codec is None:
+                raise CommandError(f'{compress} is not installed')
+        try:
+            since = parse_since(options['since']) if options['since'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        counts = Counter()
+
+        def counted(records):
+            for record in records:
+                counts['posts'] += 1
+                counts['comments'] += len(record['comments'])
+                yield record
+
+        chunks = ndjson_chunks(counted(export_records(since, options['fetch_size'])), codec)
+        if output == '-':
+            self.write_chunks(chunks, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+        else:
+            with open(output, 'wb') as f:
+                self.write_chunks(chunks, f)
+        # stdout may be the export itself
+        self.stderr.write(f"Exported {counts['posts']} posts and {counts['comments']} comments")
+
+    def write_chunks(self, chunks, f):
+        for chunk in chunks:
+            f.write(chunk)
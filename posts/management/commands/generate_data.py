@@ -0,0 +1,181 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.management.commands._timestamps import explicit_timestamps
+from posts.models import Comment, Post, make_excerpt
+from posts.vocabulary import VOCABULARY
+
+
+class TextPool:
+    """
+    Cuts random text out of one long pre-generated string
+
+    Building every text word by word would make the generator CPU bound long before the database is.
+    """
+    def __init__(self, rng, size=1_000_000):
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(VOCABULARY)
+            words.append(word)
+            length += len(word) + 1
+        self.text = ' '.join(words)
+        self.rng = rng
+
+    def get(self, min_length, max_length, mean):
+        # log-normal lengths: most texts are short, a few hit the limit
+        length = int(self.rng.lognormvariate(0, 0.8) * mean)
+        length = max(min_length, min(max_length, length))
+        start = self.rng.randrange(len(self.text) - length)
+        text = self.text[start:start + length].strip()
+        # stripping can push a text below the minimum length again
+        return text if len(text) >= min_length else text.ljust(min_length, 'x')
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates synthetic users, posts and comments for load tests and benchmarks. '
+        'The same --seed and --end always produce the same content.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='number of users to create')
+        parser.add_argument('--posts', type=int, default=10000, help='number of posts to create')
+        parser.add_argument('--comments-per-post', type=float, default=10.0, help='average comments per post')
+        parser.add_argument(
+            '--skew', type=float, default=1.5,
+            help='pareto shape of the comments per post (>1, smaller means a few posts get most comments)',
+        )
+        parser.add_argument('--max-comments-per-post', type=int, default=50000)
+        parser.add_argument('--days', type=int, default=365, help='the posts are spread over this many days')
+        parser.add_argument('--end', help='ISO timestamp of the newest post (default: now)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--username-prefix', default='synthetic')
+        parser.add_argument('--database', default='default', help='database alias to write to')
+
+    def handle(self, *args, **options):
+        if options['skew'] <= 1:
+            raise CommandError('--skew must be greater than 1')
+        end = parse_datetime(options['end']) if options['end'] else timezone.now()
+        if end is None:
+            raise CommandError('--end is not a valid ISO timestamp')
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end)
+
+        self.rng = random.Random(options['seed'])
+        self.texts = TextPool(self.rng)
+        self.database = options['database']
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+
+        with self._fast_inserts(), explicit_timestamps(Post, Comment):
+            user_ids = self._create_users(options)
+            posts, comments = self._create_posts(user_ids, end, options)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(user_ids)} users, {posts} posts and {comments} comments '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
+
+    @contextmanager
+    def _fast_inserts(self):
+        """On SQLite, skip fsyncs while generating (a crash only loses synthetic data)"""
+        connection = connections[self.database]
+        # the safety level can't change inside a transaction (e.g. when called from a test)
+        if connection.vendor != 'sqlite' or connection.in_atomic_block:
+            yield
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            previous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous = OFF')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA synchronous = {int(previous)}')
+
+    def _create_users(self, options):
+        # hashing a password per user would take hours, they all share one
+        password = make_password('synthetic-password')
+        prefix = options['username_prefix']
+        user_ids = []
+        for start in range(0, options['users'], self.batch_size):
+            stop = min(start + self.batch_size, options['users'])
+            users = [
+                User(username=f'{prefix}{i:07d}', password=password, email=f'{prefix}{i:07d}@example.com')
+                for i in range(start, stop)
+            ]
+            with transaction.atomic(using=self.database):
+                user_ids.extend(user.pk for user in User.objects.using(self.database).bulk_create(users))
+        self.stdout.write(f'{len(user_ids)} users')
+        return user_ids
+
+    def _comment_count(self, options):
+        """Pareto distributed count scaled so the average is --comments-per-post"""
+        shape = options['skew']
+        mean = shape / (shape - 1)
+        count = round(options['comments_per_post'] * self.rng.paretovariate(shape) / mean)
+        return min(count, options['max_comments_per_post'])
+
+    def _create_posts(self, user_ids, end, options):
+        if not user_ids:
+            raise CommandError('at least one user is needed to author posts')
+
+        total_posts = options['posts']
+        span = timedelta(days=options['days'])
+        step = span / max(total_posts, 1)
+        start_time = end - span
+        post_count = comment_count = 0
+
+        for start in range(0, total_posts, self.batch_size):
+            stop = min(start + self.batch_size, total_posts)
+            posts = []
+            for i in range(start, stop):
+                text_content = self.texts.get(15, 4000, 600)
+                posts.append(Post(
+                    author_id=self.rng.choice(user_ids),
+                    title=self.texts.get(4, 200, 40),
+                    text_content=text_content,
+                    # bulk_create skips Post.save(), which normally fills the excerpt
+                    excerpt=make_excerpt(text_content),
+                    # ascending timestamps so primary key order matches time order like in production
+                    timestamp=start_time + step * i + self.rng.random() * step,
+                ))
+
+            # comments reference the unsaved posts, bulk_create fills in the primary keys before they are inserted
+            comments = []
+            for post in posts:
+                post_comments = []
+                for _ in range(self._comment_count(options)):
+                    delay = timedelta(minutes=self.rng.expovariate(1 / 120))
+                    post_comments.append(Comment(
+                        parent_post=post,
+                        author_id=self.rng.choice(user_ids),
+                        text_content=self.texts.get(15, 4000, 150),
+                        timestamp=min(post.timestamp + delay, end),
+                    ))
+                # bulk_create skips the comment views, which normally keep the counters up to date
+                post.comment_count = len(post_comments)
+                post.last_activity_at = max((comment.timestamp for comment in post_comments), default=post.timestamp)
+                comments.extend(post_comments)
+
+            with transaction.atomic(using=self.database):
+                Post.objects.using(self.database).bulk_create(posts)
+                Comment.objects.using(self.database).bulk_create(comments, batch_size=self.batch_size)
+            comment_count += len(comments)
+
+            post_count += len(posts)
+            self.stdout.write(f'{post_count}/{total_posts} posts, {comment_count} comments')
+
+        return post_count, comment_count
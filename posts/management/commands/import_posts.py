@@ -0,0 +1,64 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importing import build_batch, imported_lines, insert_batch, open_input, read_batches, validated_batches
+from posts.management.commands._timestamps import explicit_timestamps
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports NDJSON posts with their comments (the format of export_posts, authors are usernames). '
+        'Runs the sanitization and the profanity filter of the API in a process pool and inserts the valid '
+        'rows in batches. Invalid posts and comments go to the rejects file. The progress is saved in the '
+        'transaction of every batch, so an interrupted import continues where it stopped (a batch whose '
+        'transaction was cut off may show up in the rejects file twice).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='NDJSON file, .gz and .zst files are decompressed')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='validation processes (0 validates in this one)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='posts per validation batch and transaction')
+        parser.add_argument('--rejects', help='file for the rejected lines (default: <input>.rejects)')
+        parser.add_argument('--restart', action='store_true', help='ignore the saved progress and start from the first line')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 0:
+            raise CommandError('--batch-size must be positive and --workers must not be negative')
+        path = options['input']
+        rejects_path = options['rejects'] or f'{path}.rejects'
+        # the key of the saved progress, the same file is found from any working directory
+        progress_path = os.path.abspath(path)
+        skip = 0 if options['restart'] else imported_lines(progress_path)
+        if skip:
+            self.stdout.write(f'Continuing after line {skip}')
+
+        try:
+            source = open_input(path)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        started = time.monotonic()
+        totals = {'posts': 0, 'comments': 0, 'rejects': 0}
+        # username -> user id, shared by all batches
+        user_ids = {}
+        with source, open(rejects_path, 'a' if skip else 'w') as rejects_file, explicit_timestamps(Post, Comment):
+            batches = read_batches(source, options['batch_size'], skip)
+            for batch in validated_batches(batches, options['workers']):
+                posts, comments, rejects = build_batch(batch, user_ids)
+                for rejected in rejects:
+                    rejects_file.write(json.dumps(rejected) + '\n')
+                # the rejects have to be on disk before the saved progress moves past them
+                rejects_file.flush()
+                insert_batch(posts, comments, progress_path, batch[-1][0])
+                totals['posts'] += len(posts)
+                totals['comments'] += len(comments)
+                totals['rejects'] += len(rejects)
+                self.stdout.write(f"{totals['posts']} posts, {totals['comments']} comments, {totals['rejects']} rejects")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['posts']} posts and {totals['comments']} comments in {time.monotonic() - started:.1f}s, "
+            f"{totals['rejects']} rejects in {rejects_path}"
+        ))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import purge_deleted_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Removes deleted posts and their comments in small batches. '
+        'Run it from cron, or keep it running with --loop as a background worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='comments removed per transaction (default: POST_PURGE_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='keep running and check for deleted posts every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            posts, comments = purge_deleted_posts(options['batch_size'])
+            if posts or not options['loop']:
+                self.stdout.write(f'Purged {posts} posts and {comments} comments')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.activity import reconcile_post_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes comment_count and last_activity_at of posts whose values drifted from their comments. '
+        'Safe to run while the API is serving requests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='posts checked per query (default: POST_RECONCILE_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        checked, repaired = reconcile_post_counters(options['batch_size'])
+        self.stdout.write(f'Checked {checked} posts, repaired {repaired}')
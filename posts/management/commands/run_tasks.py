@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from posts.tasks import run_persistent_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the due tasks of the persistent background queue. '
+        'Run it from cron, or keep it running with --loop as a background worker (several workers can run side by side).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='keep running and check for due tasks every --interval seconds')
+        parser.add_argument('--interval', type=float, default=1.0)
+        parser.add_argument('--limit', type=int, help='stop after this many tasks')
+
+    def handle(self, *args, **options):
+        while True:
+            succeeded, failed = run_persistent_tasks(options['limit'])
+            if succeeded or failed or not options['loop']:
+                self.stdout.write(f'Ran {succeeded + failed} tasks, {failed} failed')
+            if not options['loop']:
+                break
+            # the loop runs for days, don't hold on to connections that went stale meanwhile
+            close_old_connections()
+            time.sleep(options['interval'])
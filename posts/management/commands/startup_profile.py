@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.startup import measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the cold start (django.setup() and loading the urls) in a fresh interpreter '
+        'and lists the modules that take the longest to import.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters to measure, the fastest run is shown')
+        parser.add_argument('--limit', type=int, default=25, help='modules to list')
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative',
+                            help='cumulative includes the imports of a module, self only the module itself')
+        parser.add_argument('--prefix', help="only list modules starting with this, e.g. 'posts'")
+        parser.add_argument('--check', action='store_true', help='fail when the cold start is over STARTUP_BUDGET')
+
+    def handle(self, *args, **options):
+        result = measure(options['repeat'])
+        phases = result['phases']
+        self.stdout.write(
+            f"setup {phases['setup'] * 1000:.1f}ms, urls {phases['urls'] * 1000:.1f}ms, "
+            f"total {phases['total'] * 1000:.1f}ms (budget {settings.STARTUP_BUDGET * 1000:.0f}ms)"
+        )
+
+        column = 1 if options['sort'] == 'cumulative' else 0
+        modules = [
+            (name, timings) for name, timings in result['modules'].items()
+            if not options['prefix'] or name.startswith(options['prefix'])
+        ]
+        modules.sort(key=lambda item: item[1][column], reverse=True)
+        self.stdout.write(f"{'cumulative':>12} {'self':>10}  module")
+        for name, (own, cumulative) in modules[:options['limit']]:
+            self.stdout.write(f'{cumulative * 1000:10.1f}ms {own * 1000:8.1f}ms  {name}')
+
+        if options['check'] and phases['total'] > settings.STARTUP_BUDGET:
+            raise CommandError(
+                f"The cold start took {phases['total'] * 1000:.0f}ms, over the budget of {settings.STARTUP_BUDGET * 1000:.0f}ms"
+            )
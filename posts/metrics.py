@@ -0,0 +1,37 @@
+import os
+from django.db import connections
+from . import tasks
+
+
+def database_pool_stats():
+    """
+    Returns the connection pool statistics of every pooled database alias in this worker
+
+    Besides the raw psycopg_pool counters, every entry contains:
+        saturation:         share of the pool's maximum size currently handed out (1.0 = exhausted)
+        avg_wait_ms:        average time a request waited for a connection since the worker started
+    """
+    stats = {}
+    for alias in connections:
+        # only the postgres backend knows about pools, and only when OPTIONS['pool'] is set
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        raw = pool.get_stats()
+        in_use = raw.get('pool_size', 0) - raw.get('pool_available', 0)
+        queued = raw.get('requests_queued', 0)
+        stats[alias] = {
+            **raw,
+            'saturation': round(in_use / pool.max_size, 3) if pool.max_size else 0.0,
+            'avg_wait_ms': round(raw.get('requests_wait_ms', 0) / queued, 3) if queued else 0.0,
+        }
+    return stats
+
+
+def snapshot():
+    """All metrics of the current worker process"""
+    return {
+        'pid': os.getpid(),
+        'database_pools': database_pool_stats(),
+        'tasks': tasks.stats(),
+    }
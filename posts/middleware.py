@@ -0,0 +1,260 @@
+import cProfile
+import hashlib
+import time
+import tracemalloc
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.text import slugify
+from rest_framework.permissions import SAFE_METHODS
+from . import routers
+from .compression import available_codecs, choose_encoding
+
+PROFILING_HEADER = 'HTTP_X_PROFILE_TOKEN'
+PROFILING_SALT = 'posts.profiling'
+
+
+def make_profiling_token():
+    """
+    Creates a signed token for the X-Profile-Token header
+
+    Usage:  python manage.py shell -c "from posts.middleware import make_profiling_token; print(make_profiling_token())"
+    """
+    return signing.TimestampSigner(salt=PROFILING_SALT).sign('profile')
+
+
+class ProfilingMiddleware:
+    """
+    Runs single requests under cProfile and tracemalloc on demand
+
+    A request is profiled when it carries a valid signed X-Profile-Token header
+    or when a staff user (session login) adds ?profile=1 to the url.
+    The profile, the top allocation sites and the executed SQL are written to PROFILING_DIR.
+    Without PROFILING_DIR the middleware removes itself from the stack on startup.
+    """
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIR:
+            # django drops the middleware entirely, so there is no overhead at all
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.output_dir = Path(settings.PROFILING_DIR)
+
+    def __call__(self, request):
+        if not self._is_triggered(request):
+            return self.get_response(request)
+        return self._profile(request)
+
+    def _is_triggered(self, request):
+        token = request.META.get(PROFILING_HEADER)
+        if token:
+            try:
+                signing.TimestampSigner(salt=PROFILING_SALT).unsign(token, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+                return True
+            except signing.BadSignature:
+                return False
+
+        # only touch the session/user when the query parameter is actually present
+        if 'profile' in request.GET:
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_staff)
+
+        return False
+
+    def _profile(self, request):
+        queries = []
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                queries.append((context['connection'].alias, duration, sql, params))
+
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+
+        profiler = cProfile.Profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(record_query))
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+        name = self._write_report(request, profiler, snapshot, queries)
+        response['X-Profile-Id'] = name
+        return response
+
+    def _write_report(self, request, profiler, snapshot, queries):
+        """Writes <name>.prof, <name>.alloc.txt and <name>.sql.txt and returns <name>"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        name = '{}-{}-{}-{}'.format(
+            time.strftime('%Y%m%dT%H%M%S'),
+            request.method.lower(),
+            slugify(request.path) or 'root',
+            uuid.uuid4().hex[:8],
+        )
+        base = self.output_dir / name
+
+        profiler.dump_stats(f'{base}.prof')
+
+        # ignore the allocations of the profiling machinery itself
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+        ])
+        with open(f'{base}.alloc.txt', 'w') as f:
+            for stat in snapshot.statistics('lineno')[:settings.PROFILING_TOP_ALLOCATIONS]:
+                f.write(f'{stat}\n')
+
+        with open(f'{base}.sql.txt', 'w') as f:
+            total = sum(duration for _, duration, _, _ in queries)
+            f.write(f'# {len(queries)} queries, {total * 1000:.2f} ms\n')
+            for alias, duration, sql, params in queries:
+                f.write(f'[{alias}] {duration * 1000:.2f} ms: {sql} {params}\n')
+
+        return name
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins reads to the primary database for writes and for a short window after a client wrote something
+
+    Replicas lag behind the primary, without the pin a client could create a post and not see it in the
+    next GET. The pin is a signed cookie for browsers plus a cache entry keyed by the Authorization header
+    for token clients (use a shared cache like memcached/redis when running several workers).
+    Without DATABASE_REPLICAS the middleware removes itself from the stack on startup.
+    """
+    cookie_name = 'primary_pin'
+    cookie_salt = 'posts.read_your_writes'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.window = settings.READ_YOUR_WRITES_SECONDS
+
+    def __call__(self, request):
+        is_write = request.method not in SAFE_METHODS
+        token = routers.pin_to_primary(is_write or self._is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset_pin(token)
+
+        if is_write and response.status_code < 400:
+            self._pin(request, response)
+        return response
+
+    def _cache_key(self, request):
+        credentials = request.META.get('HTTP_AUTHORIZATION')
+        if not credentials:
+            return None
+        return 'primary-pin:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+    def _is_pinned(self, request):
+        if request.get_signed_cookie(self.cookie_name, default=None, salt=self.cookie_salt, max_age=self.window):
+            return True
+        key = self._cache_key(request)
+        return bool(key and cache.get(key))
+
+    def _pin(self, request, response):
+        response.set_signed_cookie(
+            self.cookie_name, '1', salt=self.cookie_salt, max_age=self.window, httponly=True, samesite='Lax',
+        )
+        key = self._cache_key(request)
+        if key:
+            cache.set(key, True, self.window)
+
+
+class CompressionMiddleware:
+    """
+    Compresses API responses with brotli, zstd or gzip, whichever the client prefers in Accept-Encoding
+
+    Only responses under API_COMPRESSION['PATH_PREFIXES'] with one of the configured content types are touched.
+    Responses below MIN_SIZE are passed through after a few cheap checks, streaming responses are compressed
+    chunk by chunk. brotli and zstd are only offered when the `brotli`/`zstandard` packages are installed.
+    """
+    def __init__(self, get_response):
+        config = settings.API_COMPRESSION
+        self.get_response = get_response
+        self.min_size = config['MIN_SIZE']
+        self.path_prefixes = tuple(config['PATH_PREFIXES'])
+        self.content_types = set(config['CONTENT_TYPES'])
+        self.codecs = available_codecs(config.get('LEVELS', {}))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self._is_compressible(request, response):
+            return response
+
+        # the body depends on Accept-Encoding from here on, even if this response stays uncompressed
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs)
+        if encoding is None:
+            return response
+        codec = self.codecs[encoding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async_stream(codec, response.streaming_content)
+            else:
+                response.streaming_content = self._compress_stream(codec, response.streaming_content)
+            # the length isn't known up front anymore
+            del response['Content-Length']
+        else:
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # the compressed body is not byte-identical anymore, a strong ETag would be wrong
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def _is_compressible(self, request, response):
+        if not request.path.startswith(self.path_prefixes):
+            return False
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return False
+        content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        return content_type in self.content_types
+
+    def _compress_stream(self, codec, chunks):
+        compressor = codec.compressor()
+        for chunk in chunks:
+            data = codec.compress_chunk(compressor, chunk)
+            if data:
+                yield data
+        yield codec.finish(compressor)
+
+    async def _compress_async_stream(self, codec, chunks):
+        compressor = codec.compressor()
+        async for chunk in chunks:
+            data = codec.compress_chunk(compressor, chunk)
+            if data:
+                yield data
+        yield codec.finish(compressor)
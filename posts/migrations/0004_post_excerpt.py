@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def make_excerpt(text, length=280):
+    # frozen copy of posts.models.make_excerpt, migrations must not change when the model code does
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip() + '…'
+
+
+def backfill_excerpts(apps, schema_editor):
+    """Fills the excerpt of existing posts in primary key batches to keep memory and transactions small"""
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'text_content')[:BATCH_SIZE])
+        if not posts:
+            break
+        for post in posts:
+            post.excerpt = make_excerpt(post.text_content)
+        Post.objects.bulk_update(posts, ['excerpt'])
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=280),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
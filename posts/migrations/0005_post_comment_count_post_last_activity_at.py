@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:05
+
+import django.utils.timezone
+import posts.models
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 2000
+
+
+def backfill_counters(apps, schema_editor):
+    """Computes the counters of existing posts in the database, one primary key batch per UPDATE"""
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    comments = Comment.objects.filter(parent_post=OuterRef('pk')).order_by()
+    count = Coalesce(Subquery(comments.values('parent_post').annotate(count=Count('pk')).values('count')), 0)
+    last_activity = Coalesce(Subquery(comments.order_by('-timestamp').values('timestamp')[:1]), F('timestamp'))
+
+    last_pk = 0
+    while True:
+        batch = list(Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE])
+        if not batch:
+            break
+        Post.objects.filter(pk__in=batch).update(comment_count=count, last_activity_at=last_activity)
+        last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity_at',
+            field=posts.models.LastActivityField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['-last_activity_at', '-id'], name='post_activity_idx'),
+        ),
+    ]
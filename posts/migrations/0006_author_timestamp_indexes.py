@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_post_comment_count_post_last_activity_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-timestamp', '-id'], name='post_author_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', '-timestamp', '-id'], name='comment_author_timestamp_idx'),
+        ),
+    ]
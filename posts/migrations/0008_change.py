@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def log_existing_rows(apps, schema_editor):
+    """Logs every visible post and comment as created, so clients syncing from the start get them too"""
+    Change = apps.get_model('posts', 'Change')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    # the posts first, a client never sees a comment before its post
+    for kind, queryset in (
+        ('post', Post.objects.filter(deleted_at__isnull=True)),
+        ('comment', Comment.objects.filter(parent_post__deleted_at__isnull=True)),
+    ):
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'timestamp')[:BATCH_SIZE])
+            if not batch:
+                break
+            Change.objects.bulk_create([
+                Change(kind=kind, object_id=pk, action='create', created_at=timestamp) for pk, timestamp in batch
+            ])
+            last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('post', 'Post'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 20:00
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_comment_post_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='change',
+            name='created_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now()),
+        ),
+    ]
@@ -1,12 +1,87 @@
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.functions import Now
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+EXCERPT_LENGTH = 280
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Shortens a text to at most `length` characters, cutting at a word boundary"""
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    # don't cut a word in half unless it is one giant word
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip() + '…'
+
+class VisiblePostManager(models.Manager):
+    """Leaves out posts that were deleted but whose comments are still being purged"""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+class LastActivityField(models.DateTimeField):
+    """
+    Starts out as the creation time of the post (its `timestamp`) unless a value is set explicitly,
+    afterwards it is only changed by the comment counters in posts/activity.py
+    """
+    def pre_save(self, model_instance, add):
+        # the fields are prepared in declaration order, so auto_now_add has already filled the timestamp
+        if add and getattr(model_instance, self.attname) is None:
+            setattr(model_instance, self.attname, model_instance.timestamp)
+        return super().pre_save(model_instance, add)
 
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=200)
     text_content = models.TextField()
+    # preview for list views, so they don't have to load the full text (kept up to date in save())
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='')
     timestamp = models.DateTimeField(auto_now_add=True)
     image = models.URLField(blank=True, null=True)  # for simplicity's sake only using URL here
+    # set when the post is deleted, the row itself is removed in the background (see posts/deletion.py)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+    # denormalized from the comments so feeds can sort by activity without a join (see posts/activity.py)
+    comment_count = models.PositiveIntegerField(default=0)
+    last_activity_at = LastActivityField()
+
+    # the first manager is the default one, so views, serializers and the admin never see deleted posts
+    objects = VisiblePostManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            # lets the purge worker find deleted posts without scanning the table
+            models.Index(fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False), name='post_pending_purge_idx'),
+            # ?ordering=activity on the post list, only visible posts are ever sorted
+            models.Index(
+                fields=['-last_activity_at', '-id'], condition=models.Q(deleted_at__isnull=True), name='post_activity_idx',
+            ),
+            # the posts of a profile page, newest first (see AuthorTimelinePagination)
+            models.Index(fields=['author', '-timestamp', '-id'], name='post_author_timestamp_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.text_content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # the counters only change through F() updates, writing back a stale copy would undo concurrent comments
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('comment_count', 'last_activity_at')
+            ]
+        if update_fields is not None and 'text_content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Change.record(self, Change.CREATE if adding else Change.UPDATE)
+
+    def delete(self, *args, **kwargs):
+        # the API hides posts instead (see posts/deletion.py), this covers the admin and the shell
+        with transaction.atomic():
+            Change.record(self, Change.DELETE)
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"Post '{self.title}' by '{self.author}' posted at {self.timestamp}"
@@ -17,5 +92,120 @@ class Comment(models.Model):
     text_content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # the comments of a profile page, newest first (see AuthorTimelinePagination)
+            models.Index(fields=['author', '-timestamp', '-id'], name='comment_author_timestamp_idx'),
+            # the comments of a post in key order, for the NDJSON export (see posts/export.py)
+            models.Index(fields=['parent_post', 'id'], name='comment_post_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Change.record(self, Change.CREATE if adding else Change.UPDATE)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # recorded first, the instance loses its pk on delete
+            Change.record(self, Change.DELETE)
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"Comment '{self.text_content}' by '{self.author}' posted at {self.timestamp}"
+
+class Task(models.Model):
+    """A task waiting in the persistent background queue (see posts/tasks.py)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # when a worker claimed the task
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # workers look for due tasks, finished tasks are deleted so the index stays small
+            models.Index(fields=['status', 'run_after'], name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Task '{self.name}' ({self.status}, {self.attempts} attempts)"
+
+class Change(models.Model):
+    """
+    An entry of the change log behind the delta sync feed (see posts/changes.py)
+
+    Written in the same transaction as the change itself by Post.save(), Comment.save()/delete()
+    and hide_post(), the bulk writes (the import, the admin actions) log theirs with bulk_record().
+    Other bulk writes and queryset updates (generate_data, the comment counters of posts) are not
+    logged, a deleted post implies the deletion of its comments.
+
+    The writers of the log are serialized until their transactions commit, so the entries become
+    visible in id order and a sync token never skips an entry that commits later. PostgreSQL takes
+    an advisory lock for that, SQLite only has one writer at a time anyway.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTION_CHOICES = [(CREATE, 'Create'), (UPDATE, 'Update'), (DELETE, 'Delete')]
+    POST = 'post'
+    COMMENT = 'comment'
+    KIND_CHOICES = [(POST, 'Post'), (COMMENT, 'Comment')]
+
+    # any number, it only has to be the same in every process
+    LOCK_KEY = 7210
+    # the primary key is the sync token, it only ever grows
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # the clock of the database, the feed compares it with its own Now() (see posts/changes.py)
+    created_at = models.DateTimeField(db_default=Now())
+
+    @classmethod
+    def lock(cls, using='default'):
+        """Waits for the other writers of the log, the lock is held until the current transaction ends"""
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [cls.LOCK_KEY])
+
+    @classmethod
+    def record(cls, instance, action):
+        """Logs a change, call it inside the transaction of the change (as late as possible, it locks the log)"""
+        cls.lock()
+        return cls.objects.create(kind=instance._meta.model_name, object_id=instance.pk, action=action)
+
+    @classmethod
+    def bulk_record(cls, kind, object_ids, action):
+        """record() for many objects of one kind"""
+        cls.lock()
+        return cls.objects.bulk_create([cls(kind=kind, object_id=object_id, action=action) for object_id in object_ids])
+
+    def __str__(self):
+        return f"Change #{self.pk}: {self.action} {self.kind} {self.object_id}"
+
+class ImportProgress(models.Model):
+    """
+    The last line of an input file that import_posts has imported (see posts/importing.py)
+
+    Saved in the transaction of every batch, so it never disagrees with the imported rows.
+    """
+    # the absolute path of the input file
+    path = models.CharField(max_length=1024, unique=True)
+    line = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Import of '{self.path}' at line {self.line}"
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AuthorTimelinePagination(CursorPagination):
+    """
+    Newest first pages of one author's posts or comments
+
+    The cursor encodes the position in the (author, timestamp) index, so every page is a single
+    range scan no matter how deep the client pages, unlike OFFSET which has to skip all previous rows.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
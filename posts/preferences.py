@@ -0,0 +1,15 @@
+def preferences(request):
+    """The preferences of the Prefer header (RFC 7240) as a dict, `return=minimal` becomes {'return': 'minimal'}"""
+    result = {}
+    for preference in request.headers.get('Prefer', '').split(','):
+        # parameters after a ';' don't matter for any preference we support
+        token, _, value = preference.split(';', 1)[0].partition('=')
+        token = token.strip().lower()
+        if token and token not in result:
+            result[token] = value.strip().strip('"').lower()
+    return result
+
+
+def prefers_minimal(request):
+    """Whether the client only wants the id and the written fields back, by header or by ?return=minimal"""
+    return preferences(request).get('return') == 'minimal' or request.query_params.get('return') == 'minimal'
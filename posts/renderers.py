@@ -0,0 +1,62 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer that serializes with orjson
+
+    The output is byte for byte the same as the compact UTF-8 JSON of the JSONRenderer:
+    datetimes, decimals etc. still go through DRF's encoder, and \u2028/\u2029 are escaped the same way.
+    Falls back to the stdlib for indented output (browsable API, `; indent=4`), for non-default
+    UNICODE_JSON/COMPACT_JSON settings, for data orjson can't handle and when orjson isn't installed.
+    Only floats (which our API doesn't return) may be formatted differently, e.g. 1e16 instead of 1e+16.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except TypeError:
+            # e.g. integers above 64 bit
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # same escaping as the JSONRenderer, so the output is a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack for internal service clients (Accept: application/msgpack or ?format=msgpack)
+
+    Values msgpack doesn't know (datetimes, decimals, ...) are converted like in the JSON output.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONRenderer.encoder_class().default, use_bin_type=True)
@@ -0,0 +1,44 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# set by ReadYourWritesMiddleware for writes and for clients that wrote a moment ago
+_use_primary = ContextVar('use_primary', default=False)
+
+# authentication and sessions must never read stale data, e.g. a freshly created token
+PRIMARY_ONLY_APPS = {'auth', 'authtoken', 'sessions', 'contenttypes', 'admin'}
+
+
+def pin_to_primary(pinned=True):
+    """Routes all reads of the current request/context to the primary, returns a token for reset_pin()"""
+    return _use_primary.set(pinned)
+
+
+def reset_pin(token):
+    _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the primary ('default') and spreads reads over the replicas in DATABASE_REPLICAS
+
+    DATABASE_REPLICAS maps a database alias to its weight, e.g. {'replica_0': 3, 'replica_1': 1}.
+    Without replicas every query goes to the primary, like without a router.
+    """
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or _use_primary.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return random.choices(list(replicas), weights=list(replicas.values()))[0]
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # no opinion, `migrate --database replica_0` can still set up a local stand-in replica
+        return None
@@ -0,0 +1,42 @@
+import re
+from django.utils.html import strip_tags as django_strip_tags
+
+# a start tag with plain attributes (quoted values may contain '>') or an end tag, which ends at the first '>'.
+# anything more exotic, like stray quotes, '<' or null characters inside a tag, is left to the HTMLParser
+TAG_RE = re.compile(r"""
+    <[a-zA-Z][-a-zA-Z0-9:]*
+    (?:[\s/]+[^\s/<>"'=\x00]+(?:\s*=\s*(?:"[^"<\x00]*"|'[^'<\x00]*'|[^\s<>"'=`\x00]+))?)*
+    [\s/]*>
+    |</[a-zA-Z][^<>\x00]*>
+""", re.VERBOSE)
+
+# elements whose content the HTMLParser doesn't parse as markup
+RAW_TEXT_RE = re.compile(r'</?(?:script|style|textarea|title|plaintext|xmp|iframe|noembed|noframes|noscript)', re.IGNORECASE)
+
+# an '&' the HTMLParser would rewrite (e.g. "&T " becomes "&T;"), only complete references and lone ampersands are safe
+UNSAFE_AMPERSAND_RE = re.compile(r'&(?!(?:[a-zA-Z][-.a-zA-Z0-9]*|#[0-9]+|#[xX][0-9a-fA-F]+);|[^a-zA-Z#]|$)')
+
+
+def strip_tags(value):
+    """
+    Returns the given HTML with all tags stripped, same output as django's strip_tags
+
+    Text without a '<' is returned right away. Everyday markup (tags, attributes, entities) is removed
+    with a single regex pass, instead of feeding the text through the HTMLParser until
+    nothing changes anymore. Everything unusual (comments, doctypes, <script> and friends,
+    stray '<', tricky ampersands) is handed to django's strip_tags so the edge cases stay identical.
+    """
+    value = str(value)
+    if '<' not in value:
+        return value
+    if '>' not in value:
+        # nothing to strip, but django rejects long runs of unclosed tags (SuspiciousOperation), so it has to look
+        return django_strip_tags(value)
+
+    if RAW_TEXT_RE.search(value) is None and ('&' not in value or UNSAFE_AMPERSAND_RE.search(value) is None):
+        stripped = TAG_RE.sub('', value)
+        # a '<' that survived belongs to something the regex doesn't understand
+        if '<' not in stripped:
+            return stripped
+
+    return django_strip_tags(value)
@@ -1,13 +1,15 @@
+import functools
 import json
 import os
 from rest_framework import serializers
-from django.utils.html import strip_tags
 from .models import Comment, Post
+from .sanitization import strip_tags
 from rest_framework.exceptions import ValidationError
 from django.contrib.auth.models import User
 
+@functools.cache
 def load_profane_words():
-    """Imports a list of banned words from a json file"""
+    """Imports a list of banned words from a json file (once, on first use)"""
     current_dir = os.path.dirname(os.path.abspath(__file__))
     file_path = os.path.join(current_dir, 'resources', 'profanity_words_list.json')
 
@@ -20,7 +22,11 @@ def load_profane_words():
 
     return banned_words
 
-PROFANE_WORDS = load_profane_words()
+def __getattr__(name):
+    # the list is only read when something validates, commands like migrate never need it
+    if name == 'PROFANE_WORDS':
+        return load_profane_words()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 class ProfanityValidator:
@@ -29,8 +35,9 @@ class ProfanityValidator:
     For the sake of simplicity, there are no checks to prevent false positives (eg. C'ass'andra and so on)
     and we only cover the english language.
     """
-    def __init__(self):
-        self.profane_words = PROFANE_WORDS
+    @property
+    def profane_words(self):
+        return load_profane_words()
 
     def __call__(self, value):
         for word in self.profane_words:
@@ -48,6 +55,13 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'parent_post', 'author', 'text_content', 'timestamp']
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # moving a comment to another post would leave the counters of both posts wrong
+            fields['parent_post'].read_only = True
+        return fields
+
     def to_internal_value(self, data):
         """Sanitization"""
         if 'text_content' in data:
@@ -55,15 +69,28 @@ class CommentSerializer(serializers.ModelSerializer):
         return super().to_internal_value(data)
 
 
+class TitleCaseField(serializers.CharField):
+    """Formatting the post Title: stored as written, shown in Title Case"""
+    def to_representation(self, value):
+        # alternatively we could use capitalize() here, depending on preference
+        return super().to_representation(value).title()
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
-    title = serializers.CharField(min_length=4, max_length=200, validators=[ProfanityValidator(), ])
+    # the formatting lives in the field, so minimal_representation() formats the title like the full one
+    title = TitleCaseField(min_length=4, max_length=200, validators=[ProfanityValidator(), ])
     text_content = serializers.CharField(min_length=15, max_length=4000, validators=[ProfanityValidator(), ])
     comments = CommentSerializer(many=True, read_only=True)
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'title', 'text_content', 'timestamp', 'image', 'comments']
+        fields = [
+            'id', 'author', 'title', 'text_content', 'excerpt', 'timestamp', 'image',
+            'comment_count', 'last_activity_at', 'comments',
+        ]
+        # the excerpt is derived from text_content when the post is saved, the counters are kept up to date by the comment views
+        read_only_fields = ['excerpt', 'comment_count', 'last_activity_at']
 
     def to_internal_value(self, data):
         """Sanitization"""
@@ -74,16 +101,56 @@ class PostSerializer(serializers.ModelSerializer):
         # after our manual intervention, continue regulary
         return super().to_internal_value(data)
 
-    def to_representation(self, instance):
-        """Formatting the post Title"""
-        # get the standard dictionary from the parent class
-        representation = super().to_representation(instance)
 
-        if instance.title:
-            # alternatively we could use capitalize() here, depending on preference
-            representation['title'] = instance.title.title()
+def minimal_representation(serializer):
+    """
+    The id and the written fields of a saved serializer, for Prefer: return=minimal
+
+    Only the values that were just written are represented, so there is no nested serialization
+    (the comments of a post) and no query.
+    """
+    data = {'id': serializer.instance.pk}
+    for name in serializer.validated_data:
+        field = serializer.fields[name]
+        attribute = field.get_attribute(serializer.instance)
+        data[name] = None if attribute is None else field.to_representation(attribute)
+    return data
+
+
+class PostSummarySerializer(PostSerializer):
+    """
+    Read-only variant of the PostSerializer for feeds, which only shows the excerpt of the text
+    Use it with Post.objects.defer('text_content') so the full text isn't even loaded from the database
+    """
+    class Meta(PostSerializer.Meta):
+        fields = ['id', 'author', 'title', 'excerpt', 'timestamp', 'image', 'comment_count', 'last_activity_at', 'comments']
+
+
+class PostChangeSerializer(PostSerializer):
+    """The full post without its comments for the change feed, the comments are changes of their own"""
+    class Meta(PostSerializer.Meta):
+        fields = [field for field in PostSerializer.Meta.fields if field != 'comments']
+
+
+class PostImportSerializer(PostSerializer):
+    """
+    Validation and sanitization of the PostSerializer for the bulk import (see posts/importing.py)
+    The author is a username and the timestamp can be set, the comments are validated one by one
+    """
+    author = serializers.CharField(max_length=150)
+    timestamp = serializers.DateTimeField(required=False)
+
+    class Meta(PostSerializer.Meta):
+        fields = ['author', 'title', 'text_content', 'image', 'timestamp']
+
+
+class CommentImportSerializer(CommentSerializer):
+    """Like the PostImportSerializer, without the parent_post lookup (a comment is imported with its post)"""
+    author = serializers.CharField(max_length=150)
+    timestamp = serializers.DateTimeField(required=False)
 
-        return representation
+    class Meta(CommentSerializer.Meta):
+        fields = ['author', 'text_content', 'timestamp']
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
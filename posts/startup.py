@@ -0,0 +1,99 @@
+"""
+Measures the cold start of the project: django.setup() and loading the urls, with the import time of every module
+
+Run in a fresh interpreter (python -m posts.startup), the result is printed as JSON, or use
+measure() / manage.py startup_profile. Only the standard library is imported before the timer
+is installed, so nothing is missed.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+class ImportTimer:
+    """
+    Meta path finder that times the execution of every module imported while it is installed
+
+    Unlike `python -X importtime` it also sees modules loaded with importlib.import_module(),
+    which is how django imports the settings, the apps, their models and the urlconf.
+    """
+    def __init__(self):
+        # module name -> [seconds spent in the module itself, seconds including its own imports]
+        self.timings = {}
+        self.stack = []
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        # built-in and frozen modules are loaded by shared classes, their time counts towards the importer
+        loader = spec.loader
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, 'exec_module'):
+            exec_module = loader.exec_module
+            loader.exec_module = lambda module: self.time(name, exec_module, module)
+        return spec
+
+    def time(self, name, exec_module, module):
+        self.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self.stack.pop()
+            if self.stack:
+                self.stack[-1] += cumulative
+            self.timings[name] = [cumulative - children, cumulative]
+
+
+def profile():
+    """Sets django up and loads the urls, returns the seconds per phase and the import times per module"""
+    timer = ImportTimer()
+    timer.install()
+    try:
+        start = time.perf_counter()
+        import django
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        django.setup()
+        setup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        from django.urls import get_resolver
+        get_resolver().url_patterns
+        urls = time.perf_counter() - start
+    finally:
+        timer.uninstall()
+
+    return {
+        'phases': {'setup': setup, 'urls': urls, 'total': setup + urls},
+        'modules': timer.timings,
+    }
+
+
+def measure(repeat=1):
+    """Profiles the cold start in `repeat` fresh interpreters, returns the fastest run"""
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-m', 'posts.startup'], cwd=base_dir, capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(result.stdout))
+    return min(runs, key=lambda run: run['phases']['total'])
+
+
+if __name__ == '__main__':
+    json.dump(profile(), sys.stdout)
@@ -0,0 +1,213 @@
+import logging
+import os
+import random
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import routers
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """
+    Registers a function as background task and gives it an enqueue() method
+
+    Usage:
+        @task
+        def reindex_post(post_id):
+            ...
+
+        reindex_post.enqueue(post.pk)                    # thread pool of this worker process
+        reindex_post.enqueue(post.pk, persistent=True)   # database queue, survives restarts (manage.py run_tasks)
+    """
+    func.task_name = f'{func.__module__}.{func.__qualname__}'
+    func.enqueue = lambda *args, persistent=False, **kwargs: enqueue(func, *args, persistent=persistent, **kwargs)
+    return func
+
+
+def get_task(name):
+    """Looks up a registered task by name, only decorated functions can be run from the database"""
+    func = import_string(name)
+    if getattr(func, 'task_name', None) != name:
+        raise ValueError(f'{name} is not a registered task')
+    return func
+
+
+def retry_delay(attempt):
+    """Seconds to wait after the given (1-based) failed attempt, the jitter keeps retries of a burst apart"""
+    return settings.TASK_QUEUE['RETRY_BACKOFF'] * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+
+
+def execute(func, args, kwargs):
+    # the task runs right after the commit, a replica may not have the data yet
+    token = routers.pin_to_primary()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        routers.reset_pin(token)
+
+
+class ThreadQueue:
+    """
+    Runs tasks on a bounded thread pool inside the current worker process
+
+    When MAX_PENDING tasks are already waiting, new ones run inline in the caller instead.
+    That slows the request down, but never loses a task or lets the backlog grow without bounds.
+    """
+    COUNTERS = ('enqueued', 'succeeded', 'retried', 'failed', 'ran_inline')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+        self.pending = 0
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def _get_executor(self):
+        # a forked worker (gunicorn --preload) can't use the threads of its parent
+        if self.pid != os.getpid():
+            self.executor = ThreadPoolExecutor(settings.TASK_QUEUE['WORKERS'], thread_name_prefix='posts-task')
+            self.pid = os.getpid()
+            self.pending = 0
+        return self.executor
+
+    def submit(self, func, args, kwargs, attempt=1):
+        with self.lock:
+            if attempt == 1:
+                self.counters['enqueued'] += 1
+            inline = self.pending >= settings.TASK_QUEUE['MAX_PENDING']
+            if not inline:
+                self.pending += 1
+                executor = self._get_executor()
+        if inline:
+            self._count('ran_inline')
+            self._run(func, args, kwargs, attempt)
+        else:
+            executor.submit(self._run_in_thread, func, args, kwargs, attempt)
+
+    def _run_in_thread(self, func, args, kwargs, attempt):
+        # like a request: connections that are broken or past CONN_MAX_AGE are replaced
+        close_old_connections()
+        try:
+            self._run(func, args, kwargs, attempt)
+        finally:
+            close_old_connections()
+            with self.lock:
+                self.pending -= 1
+
+    def _run(self, func, args, kwargs, attempt):
+        try:
+            execute(func, args, kwargs)
+        except Exception:
+            if attempt > settings.TASK_QUEUE['MAX_RETRIES']:
+                self._count('failed')
+                logger.exception('Task %s failed after %d attempts', func.task_name, attempt)
+                return
+            self._count('retried')
+            logger.warning('Task %s failed (attempt %d), retrying', func.task_name, attempt, exc_info=True)
+            timer = threading.Timer(retry_delay(attempt), self.submit, (func, args, kwargs, attempt + 1))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._count('succeeded')
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, 'pending': self.pending, 'workers': settings.TASK_QUEUE['WORKERS']}
+
+
+thread_queue = ThreadQueue()
+
+
+def run_eagerly(func, args, kwargs):
+    """Runs a task with all its retries right away (TASK_QUEUE['EAGER']), the last error is raised"""
+    for attempt in range(1, settings.TASK_QUEUE['MAX_RETRIES'] + 2):
+        try:
+            return execute(func, args, kwargs)
+        except Exception:
+            if attempt > settings.TASK_QUEUE['MAX_RETRIES']:
+                raise
+
+
+def enqueue(func, *args, persistent=False, **kwargs):
+    """
+    Schedules a registered task to run after the current transaction commits (right away outside of one)
+
+    Tasks never see a write that is rolled back. Persistent tasks are stored in the same transaction
+    as the write that caused them, so either both are committed or neither is.
+    """
+    if settings.TASK_QUEUE['EAGER']:
+        transaction.on_commit(lambda: run_eagerly(func, args, kwargs))
+    elif persistent:
+        Task.objects.create(name=func.task_name, args=list(args), kwargs=kwargs)
+    else:
+        transaction.on_commit(lambda: thread_queue.submit(func, args, kwargs))
+
+
+def claim_task():
+    """
+    Takes the next due task from the database queue, or returns None
+
+    The conditional UPDATE makes sure only one worker gets a task, also on databases without
+    SELECT ... FOR UPDATE SKIP LOCKED. Tasks of crashed workers are picked up again after LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_QUEUE['LOCK_TIMEOUT'])
+    claimable = Q(status=Task.PENDING, run_after__lte=now) | Q(status=Task.RUNNING, locked_at__lt=stale)
+    for pk in Task.objects.filter(claimable).order_by('run_after').values_list('pk', flat=True)[:10]:
+        claimed = Task.objects.filter(claimable, pk=pk).update(
+            status=Task.RUNNING, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run_persistent_tasks(limit=None):
+    """Runs due tasks of the database queue until none are left (or `limit` ran), returns (succeeded, failed)"""
+    succeeded = failed = 0
+    while limit is None or succeeded + failed < limit:
+        row = claim_task()
+        if row is None:
+            break
+        try:
+            execute(get_task(row.name), row.args, row.kwargs)
+        except Exception:
+            failed += 1
+            logger.exception('Task %s failed (attempt %d)', row.name, row.attempts)
+            if row.attempts <= settings.TASK_QUEUE['MAX_RETRIES']:
+                status, run_after = Task.PENDING, timezone.now() + timedelta(seconds=retry_delay(row.attempts))
+            else:
+                # kept for inspection, set the status back to pending to try again
+                status, run_after = Task.FAILED, row.run_after
+            Task.objects.filter(pk=row.pk).update(
+                status=status, run_after=run_after, locked_at=None, last_error=traceback.format_exc(),
+            )
+        else:
+            succeeded += 1
+            Task.objects.filter(pk=row.pk).delete()
+    return succeeded, failed
+
+
+def stats():
+    """Counters of this worker's thread pool and the size of the database queue"""
+    persistent = Task.objects.aggregate(
+        pending=Count('pk', filter=Q(status=Task.PENDING)),
+        running=Count('pk', filter=Q(status=Task.RUNNING)),
+        failed=Count('pk', filter=Q(status=Task.FAILED)),
+    )
+    return {'threads': thread_queue.stats(), 'persistent': persistent}
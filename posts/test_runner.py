@@ -0,0 +1,39 @@
+from unittest import TestSuite
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .throttling import reset_store
+
+
+def iter_tests(suite):
+    for test in suite:
+        if isinstance(test, TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests with the throttles counting in private memory, reset after every test
+
+    A shared table would let test runs throttle each other (and a server on the same host), and
+    counts carried over from earlier tests would make a test fail depending on what ran before it.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.private_throttles = override_settings(THROTTLE_STORE={**settings.THROTTLE_STORE, 'SHARED': False})
+        self.private_throttles.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.private_throttles.disable()
+        super().teardown_test_environment(**kwargs)
+
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        for test in iter_tests(suite):
+            # runs after the test, in whichever process runs it
+            test.addCleanup(reset_store)
+        return suite
@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ...admin import EstimatedCountPaginator, estimated_count
+from ...models import Change, Comment, Post, Task
+
+
+# the manifest storage would need collectstatic to render the admin pages
+@override_settings(
+    TASK_QUEUE={**settings.TASK_QUEUE, 'EAGER': False},
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_superuser(username='staff', password='secure_password123')
+        self.client.force_login(self.staff)
+        self.author = User.objects.create_user(username='author', password='secure_password123')
+
+    def _create_posts(self, count):
+        return Post.objects.bulk_create([
+            Post(author=self.author, title=f"Post {i}", text_content="The text of the post") for i in range(count)
+        ])
+
+    def _changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    ### VALID
+    def test_changelist_queries_dont_grow_with_the_rows(self):
+        """Confirms that the authors are joined instead of loaded per row"""
+        url = reverse('admin:posts_post_changelist')
+        self._create_posts(2)
+        few = self._changelist_queries(url)
+        self._create_posts(30)
+
+        self.assertEqual(self._changelist_queries(url), few)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+    def test_counts_are_capped_or_estimated(self):
+        """Confirms that filtered counts stop at the limit and unfiltered ones use the table statistics"""
+        self._create_posts(5)
+        posts = Post.objects.order_by('-pk')
+
+        self.assertEqual(EstimatedCountPaginator(posts, 2).count, 3)
+        self.assertIsNone(estimated_count(Post, 'default'))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(EstimatedCountPaginator(posts, 2, filtered=False).count, 5)
+
+    def test_search_counts_as_filtered(self):
+        """Confirms that only the unfiltered changelist may use the estimate"""
+        url = reverse('admin:posts_post_changelist')
+
+        self.assertFalse(self.client.get(url).context['cl'].paginator.filtered)
+        self.assertTrue(self.client.get(url, {'q': 'author'}).context['cl'].paginator.filtered)
+
+    def test_pages_load_the_rows_of_their_keys(self):
+        """Confirms that a page holds the rows of its offset in the order of the changelist"""
+        created = self._create_posts(5)
+        page = EstimatedCountPaginator(Post.objects.order_by('-pk'), 2).page(2)
+
+        self.assertEqual([post.pk for post in page], [created[2].pk, created[1].pk])
+
+    @override_settings(ADMIN_ACTION_BATCH_SIZE=2)
+    def test_hide_action_works_in_batches(self):
+        """Confirms that the selected posts are hidden, logged and queued for the purge"""
+        created = self._create_posts(5)
+        selected = [post.pk for post in created[:3]]
+
+        response = self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'hide_selected', ACTION_CHECKBOX_NAME: selected,
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            sorted(Change.objects.filter(kind=Change.POST, action=Change.DELETE).values_list('object_id', flat=True)),
+            selected,
+        )
+        self.assertEqual(Task.objects.filter(name__endswith='purge_post').count(), 3)
+
+    @override_settings(ADMIN_ACTION_BATCH_SIZE=2)
+    def test_delete_comments_action_updates_the_counters(self):
+        """Confirms that deleted comments are logged and the counters of their posts recomputed"""
+        post = self._create_posts(1)[0]
+        comments = [Comment.objects.create(parent_post=post, author=self.author, text_content=f"Comment number {i}") for i in range(3)]
+        Post.objects.filter(pk=post.pk).update(comment_count=3)
+
+        self.client.post(reverse('admin:posts_comment_changelist'), {
+            'action': 'delete_selected_comments', ACTION_CHECKBOX_NAME: [comment.pk for comment in comments[1:]],
+        })
+
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(post.last_activity_at, comments[0].timestamp)
+        self.assertEqual(Change.objects.filter(kind=Change.COMMENT, action=Change.DELETE).count(), 2)
+
+    ### INVALID
+    def test_delete_selected_is_not_offered(self):
+        """Confirms that django's delete action, which collects every related row, is disabled"""
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+
+        self.assertNotIn('delete_selected', response.context['action_form'].fields['action'].choices.__str__())
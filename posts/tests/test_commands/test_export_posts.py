@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from ...deletion import hide_post
+from ...models import Post, Comment
+
+
+class ExportPostsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='some_password')
+        self.bob = User.objects.create_user(username='bob', password='some_password')
+        self.first = Post.objects.create(author=self.alice, title="First", text_content="The first post")
+        self.second = Post.objects.create(author=self.bob, title="Second", text_content="The second post")
+        self.hidden = Post.objects.create(author=self.alice, title="Hidden", text_content="This post gets deleted")
+        # written out of post order, the export still groups them by post
+        Comment.objects.create(parent_post=self.second, author=self.alice, text_content="On the second post")
+        Comment.objects.create(parent_post=self.first, author=self.bob, text_content="On the first post")
+        Comment.objects.create(parent_post=self.hidden, author=self.bob, text_content="On the hidden post")
+        Comment.objects.create(parent_post=self.first, author=self.alice, text_content="Another one")
+        hide_post(self.hidden)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _export(self, filename='posts.ndjson', **options):
+        path = os.path.join(self.directory.name, filename)
+        err = StringIO()
+        call_command('export_posts', output=path, stderr=err, **options)
+        opener = gzip.open if filename.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            return [json.loads(line) for line in f], err.getvalue()
+
+    ### VALID
+    def test_exports_posts_with_their_comments(self):
+        """Confirms that every visible post is one line, in key order, with its comments and the author usernames"""
+        records, err = self._export(fetch_size=1)
+
+        self.assertEqual([record['id'] for record in records], [self.first.pk, self.second.pk])
+        self.assertEqual(records[0]['author'], 'alice')
+        self.assertEqual(records[0]['text_content'], "The first post")
+        self.assertEqual(
+            [(comment['author'], comment['text_content']) for comment in records[0]['comments']],
+            [('bob', "On the first post"), ('alice', "Another one")],
+        )
+        self.assertEqual([comment['author'] for comment in records[1]['comments']], ['alice'])
+        self.assertIn('Exported 2 posts and 3 comments', err)
+
+    def test_compression_follows_the_extension(self):
+        """Confirms that a .gz output is written as gzip"""
+        records, _ = self._export('posts.ndjson.gz')
+
+        self.assertEqual(len(records), 2)
+
+    def test_since_exports_recent_activity_only(self):
+        """Confirms that --since skips the posts without activity since then"""
+        Post.objects.filter(pk=self.first.pk).update(last_activity_at=timezone.now() - timedelta(days=2))
+
+        records, _ = self._export(since=(timezone.now() - timedelta(days=1)).isoformat())
+
+        self.assertEqual([record['id'] for record in records], [self.second.pk])
+        self.assertEqual(len(records[0]['comments']), 1)
+
+    ### INVALID
+    def test_invalid_since_is_rejected(self):
+        with self.assertRaises(CommandError):
+            self._export(since='yesterday')
@@ -0,0 +1,66 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from ...models import Post, Comment
+
+
+class GenerateDataTests(TestCase):
+    def _generate(self, **options):
+        options = {'users': 5, 'posts': 30, 'comments_per_post': 4, 'batch_size': 7, 'end': '2026-01-01T12:00:00', **options}
+        call_command('generate_data', stdout=StringIO(), **options)
+
+    ### VALID
+    def test_creates_requested_rows(self):
+        """Confirms that the requested number of users and posts is created across several batches"""
+        self._generate()
+
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertTrue(Comment.objects.exists())
+
+    def test_same_seed_same_content(self):
+        """Confirms that generating twice with the same seed produces identical content"""
+        self._generate(seed=3)
+        first = list(Post.objects.order_by('pk').values_list('title', 'text_content', 'timestamp'))
+        first_comments = Comment.objects.count()
+
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        self._generate(seed=3)
+        second = list(Post.objects.order_by('pk').values_list('title', 'text_content', 'timestamp'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(Comment.objects.count(), first_comments)
+
+    def test_generated_text_respects_serializer_limits(self):
+        """Confirms that titles and texts stay within the lengths the serializers accept"""
+        self._generate()
+
+        for title, text_content in Post.objects.values_list('title', 'text_content'):
+            self.assertTrue(4 <= len(title) <= 200)
+            self.assertTrue(15 <= len(text_content) <= 4000)
+
+    def test_timestamps_follow_primary_key_order(self):
+        """Confirms that the generated timestamps are kept and ascend with the primary key"""
+        self._generate()
+
+        timestamps = list(Post.objects.order_by('pk').values_list('timestamp', flat=True))
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertLess(timestamps[-1].year, 2027)
+
+    def test_counters_match_comments(self):
+        """Confirms that the generated posts get the comment counters the comment views would maintain"""
+        self._generate()
+
+        for post in Post.objects.all():
+            comments = list(post.comments.values_list('timestamp', flat=True))
+            self.assertEqual(post.comment_count, len(comments))
+            self.assertEqual(post.last_activity_at, max(comments, default=post.timestamp))
+
+    ### INVALID
+    def test_skew_must_be_above_one(self):
+        """Confirms that a pareto shape of 1 or less is rejected (its mean would be infinite)"""
+        with self.assertRaises(CommandError):
+            self._generate(skew=1)
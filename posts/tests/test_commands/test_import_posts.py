@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from ... import importing
+from ...models import Change, ImportProgress, Post, Comment
+
+
+class ImportPostsTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='some_password')
+        self.bob = User.objects.create_user(username='bob', password='some_password')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'posts.ndjson')
+
+    def _write(self, *records):
+        with open(self.path, 'w') as f:
+            for record in records:
+                f.write((record if isinstance(record, str) else json.dumps(record)) + '\n')
+
+    def _import(self, **options):
+        options.setdefault('workers', 0)
+        call_command('import_posts', self.path, stdout=StringIO(), **options)
+        with open(f'{self.path}.rejects') as f:
+            return [json.loads(line) for line in f]
+
+    def _post(self, title="Imported post", author='alice', comments=()):
+        return {'author': author, 'title': title, 'text_content': "<b>The text</b> of an imported post", 'comments': list(comments)}
+
+    def _comment(self, text_content="An imported comment", author='bob', **fields):
+        return {'author': author, 'text_content': text_content, **fields}
+
+    ### VALID
+    def test_imports_posts_with_their_comments(self):
+        """Confirms that posts and comments are inserted with their authors, timestamps, excerpts and counters"""
+        self._write(self._post(comments=[
+            self._comment(timestamp='2026-01-02T10:00:00Z'),
+            self._comment(author='alice', timestamp='2026-01-03T10:00:00Z'),
+        ]) | {'timestamp': '2026-01-01T10:00:00Z'})
+
+        rejects = self._import()
+
+        self.assertEqual(rejects, [])
+        post = Post.objects.get()
+        self.assertEqual(post.author, self.alice)
+        self.assertEqual(post.text_content, "The text of an imported post")
+        self.assertEqual(post.excerpt, "The text of an imported post")
+        self.assertEqual(post.timestamp.isoformat(), '2026-01-01T10:00:00+00:00')
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(post.last_activity_at.isoformat(), '2026-01-03T10:00:00+00:00')
+        self.assertEqual(
+            list(post.comments.order_by('id').values_list('author__username', flat=True)), ['bob', 'alice'],
+        )
+        self.assertEqual(Change.objects.filter(action=Change.CREATE).count(), 3)
+
+    def test_validates_in_worker_processes(self):
+        """Confirms that the import gives the same result with a process pool"""
+        self._write(*[self._post(f"Post number {i}", comments=[self._comment()]) for i in range(5)], self._post("Shit post"))
+
+        rejects = self._import(workers=2, batch_size=2)
+
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 5)
+        self.assertEqual([reject['line'] for reject in rejects], [6])
+
+    def test_imports_a_zstd_export(self):
+        """Confirms that a .zst file written by export_posts imports back line by line"""
+        if importing.zstandard is None:
+            self.skipTest('zstandard is not installed')
+        post = Post.objects.create(title="Exported post", text_content="The text of an exported post", author=self.alice)
+        Comment.objects.create(parent_post=post, author=self.bob, text_content="An exported comment")
+        path = os.path.join(self.directory.name, 'posts.ndjson.zst')
+        call_command('export_posts', output=path, stdout=StringIO(), stderr=StringIO())
+
+        call_command('import_posts', path, workers=0, stdout=StringIO())
+
+        self.assertEqual(Post.objects.filter(title="Exported post").count(), 2)
+        self.assertEqual(Comment.objects.filter(text_content="An exported comment").count(), 2)
+
+    def test_saved_progress_skips_imported_lines(self):
+        """Confirms that an import continues after the last imported line and that --restart ignores it"""
+        self._write(self._post("First post"), self._post("Second post"))
+        ImportProgress.objects.create(path=self.path, line=1)
+
+        self._import()
+        self.assertEqual(list(Post.objects.values_list('title', flat=True)), ["Second post"])
+        self.assertEqual(ImportProgress.objects.get(path=self.path).line, 2)
+
+        self._import(restart=True)
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_interrupted_batch_is_imported_once(self):
+        """Confirms that a batch whose transaction failed is neither imported nor skipped when the import runs again"""
+        self._write(self._post("First post"), self._post("Second post"))
+        with mock.patch.object(Change, 'bulk_record', side_effect=[None, None, None, RuntimeError]), self.assertRaises(RuntimeError):
+            self._import(batch_size=1)
+        self.assertEqual(list(Post.objects.values_list('title', flat=True)), ["First post"])
+
+        self._import(batch_size=1)
+        self.assertEqual(list(Post.objects.order_by('id').values_list('title', flat=True)), ["First post", "Second post"])
+
+    ### INVALID
+    def test_invalid_rows_are_rejected(self):
+        """Confirms that invalid posts and comments end up in the rejects file while the valid rows are imported"""
+        self._write(
+            self._post("Shit post", comments=[self._comment()]),
+            self._post(comments=[self._comment("Too short"), self._comment(), self._comment(author='nobody')]),
+            self._post(author='nobody'),
+            '{"not json',
+        )
+
+        rejects = self._import()
+
+        self.assertEqual(
+            [(reject['line'], reject['comment'], list(reject['errors'])) for reject in rejects],
+            [(1, None, ['title']), (2, 0, ['text_content']), (2, 2, ['author']), (3, None, ['author']), (4, None, ['line'])],
+        )
+        post = Post.objects.get()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(post.comments.get().author, self.bob)
@@ -0,0 +1,47 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ...deletion import hide_post, purge_post
+from ...models import Post, Comment
+
+
+class PurgeDeletedPostsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='some_password')
+        self.deleted_post = Post.objects.create(author=self.user, title="Deleted", text_content="This post gets deleted")
+        self.kept_post = Post.objects.create(author=self.user, title="Kept", text_content="This post stays around")
+        for post in (self.deleted_post, self.kept_post):
+            Comment.objects.bulk_create([
+                Comment(parent_post=post, author=self.user, text_content=f"Comment number {i}") for i in range(5)
+            ])
+        hide_post(self.deleted_post)
+
+    def test_purge_removes_hidden_posts_and_comments(self):
+        """Confirms that the command removes hidden posts with their comments and leaves the rest alone"""
+        out = StringIO()
+        call_command('purge_deleted_posts', batch_size=2, stdout=out)
+
+        self.assertIn('Purged 1 posts and 5 comments', out.getvalue())
+        self.assertFalse(Post.all_objects.filter(pk=self.deleted_post.pk).exists())
+        self.assertFalse(Comment.objects.filter(parent_post_id=self.deleted_post.pk).exists())
+        self.assertEqual(self.kept_post.comments.count(), 5)
+
+    def test_purge_works_in_batches(self):
+        """Confirms that comments are deleted in batches of the given size"""
+        with CaptureQueriesContext(connection) as queries:
+            removed = purge_post(self.deleted_post.pk, batch_size=2)
+
+        # the final post delete adds one (empty) cascade delete by parent_post_id, which isn't a batch
+        comment_deletes = [q for q in queries if q['sql'].startswith('DELETE FROM "posts_comment" WHERE "posts_comment"."id" IN')]
+        self.assertEqual(removed, 5)
+        # 5 comments in batches of 2
+        self.assertEqual(len(comment_deletes), 3)
+
+    def test_visible_posts_are_never_purged(self):
+        """Confirms that purging a post that was not deleted leaves the post itself in place"""
+        purge_post(self.kept_post.pk)
+
+        self.assertTrue(Post.objects.filter(pk=self.kept_post.pk).exists())
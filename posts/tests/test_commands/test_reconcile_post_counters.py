@@ -0,0 +1,45 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from ...activity import reconcile_post_counters
+from ...models import Post, Comment
+
+
+class ReconcilePostCountersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='some_password')
+        self.posts = [
+            Post.objects.create(author=self.user, title=f"Post {i}", text_content="Some text for the post") for i in range(5)
+        ]
+        # bulk_create bypasses the views, so the counters of the first post drift
+        self.comments = Comment.objects.bulk_create([
+            Comment(parent_post=self.posts[0], author=self.user, text_content=f"Comment number {i}") for i in range(3)
+        ])
+
+    ### VALID
+    def test_repairs_drifted_counters(self):
+        """Confirms that drifted posts are recomputed from their comments across several batches"""
+        out = StringIO()
+        call_command('reconcile_post_counters', batch_size=2, stdout=out)
+
+        self.assertIn('Checked 5 posts, repaired 1', out.getvalue())
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(post.comment_count, 3)
+        self.assertEqual(post.last_activity_at, max(comment.timestamp for comment in self.comments))
+
+    def test_posts_without_comments_fall_back_to_their_timestamp(self):
+        Post.objects.filter(pk=self.posts[1].pk).update(comment_count=7)
+
+        reconcile_post_counters()
+
+        post = Post.objects.get(pk=self.posts[1].pk)
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(post.last_activity_at, post.timestamp)
+
+    ### INVALID
+    def test_consistent_counters_are_not_rewritten(self):
+        """Confirms that a second run finds nothing to repair"""
+        reconcile_post_counters()
+
+        self.assertEqual(reconcile_post_counters(batch_size=2), (5, 0))
@@ -0,0 +1,21 @@
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class StartupProfileTests(SimpleTestCase):
+    ### VALID
+    def test_lists_phases_and_modules(self):
+        out = StringIO()
+        call_command('startup_profile', repeat=1, limit=5, prefix='posts', stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('total', lines[0])
+        self.assertEqual(len(lines), 2 + 5)
+        self.assertTrue(all(line.split()[-1].startswith('posts') for line in lines[2:]))
+
+    ### INVALID
+    @override_settings(STARTUP_BUDGET=0.001)
+    def test_check_fails_over_budget(self):
+        with self.assertRaisesMessage(CommandError, 'over the budget of 1ms'):
+            call_command('startup_profile', repeat=1, check=True, stdout=StringIO())
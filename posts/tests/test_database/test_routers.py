@@ -0,0 +1,78 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from ...middleware import ReadYourWritesMiddleware
+from ...models import Post
+from ...routers import PrimaryReplicaRouter, pin_to_primary, reset_pin
+
+
+@override_settings(DATABASE_REPLICAS={'replica_0': 1, 'replica_1': 3})
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replicas(self):
+        """Confirms that content reads are spread over the configured replicas"""
+        aliases = {self.router.db_for_read(Post) for _ in range(200)}
+        self.assertEqual(aliases, {'replica_0', 'replica_1'})
+
+    def test_replica_selection_is_weighted(self):
+        """Confirms that a replica with three times the weight gets roughly three times the reads"""
+        reads = [self.router.db_for_read(Post) for _ in range(4000)]
+        share = reads.count('replica_1') / len(reads)
+        self.assertAlmostEqual(share, 0.75, delta=0.05)
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_authentication_reads_go_to_primary(self):
+        """Confirms that token lookups never read from a (possibly lagging) replica"""
+        self.assertEqual(self.router.db_for_read(Token), 'default')
+
+    def test_pinned_reads_go_to_primary(self):
+        token = pin_to_primary()
+        try:
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        finally:
+            reset_pin(token)
+
+    @override_settings(DATABASE_REPLICAS={})
+    def test_without_replicas_everything_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+
+@override_settings(DATABASE_REPLICAS={'replica_0': 1}, READ_YOUR_WRITES_SECONDS=5)
+class ReadYourWritesMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+        self.middleware = ReadYourWritesMiddleware(self._view)
+
+    def _view(self, request):
+        # reports which database a read would use while the request is handled
+        return HttpResponse(self.router.db_for_read(Post))
+
+    def test_safe_request_reads_from_replica(self):
+        response = self.middleware(self.factory.get('/api/posts/'))
+        self.assertEqual(response.content, b'replica_0')
+
+    def test_write_reads_from_primary(self):
+        response = self.middleware(self.factory.post('/api/posts/'))
+        self.assertEqual(response.content, b'default')
+
+    def test_reads_after_write_stay_on_primary(self):
+        """Confirms that the cookie set by a write pins the following reads of the same client"""
+        write = self.middleware(self.factory.post('/api/posts/'))
+
+        request = self.factory.get('/api/posts/')
+        request.COOKIES.update({key: morsel.value for key, morsel in write.cookies.items()})
+        self.assertEqual(self.middleware(request).content, b'default')
+
+    def test_token_client_reads_after_write_stay_on_primary(self):
+        """Confirms that clients without cookies are pinned through their Authorization header"""
+        self.middleware(self.factory.post('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+
+        same_client = self.middleware(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token abc'))
+        other_client = self.middleware(self.factory.get('/api/posts/', HTTP_AUTHORIZATION='Token xyz'))
+        self.assertEqual(same_client.content, b'default')
+        self.assertEqual(other_client.content, b'replica_0')
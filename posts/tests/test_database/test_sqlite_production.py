@@ -0,0 +1,41 @@
+import os
+import tempfile
+from django.conf import settings
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class SQLiteProductionModeTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # a separate connection handler, so the test database stays untouched
+        self.connections = ConnectionHandler({
+            # django insists on a default alias, the empty one is a dummy backend
+            'default': {},
+            'production': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory.name, 'production.sqlite3'),
+                'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS,
+            },
+        })
+        self.connection = self.connections['production']
+        self.addCleanup(self.connections.close_all)
+
+    def _pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_connect(self):
+        """Confirms that every new connection runs with WAL and the tuned pragmas"""
+        self.assertEqual(self._pragma('journal_mode'), 'wal')
+        # 1 == NORMAL
+        self.assertEqual(self._pragma('synchronous'), 1)
+        self.assertGreater(self._pragma('busy_timeout'), 0)
+        self.assertLess(self._pragma('cache_size'), 0)
+
+    def test_transactions_take_the_write_lock_immediately(self):
+        """Confirms that atomic blocks start with BEGIN IMMEDIATE instead of a deferred read lock"""
+        self.connection.ensure_connection()
+        self.assertEqual(self.connection.transaction_mode, 'IMMEDIATE')
@@ -0,0 +1,96 @@
+import gzip
+import json
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from ... import compression
+from ...middleware import CompressionMiddleware
+
+LARGE_BODY = json.dumps([{'id': i, 'title': 'Some Post', 'text_content': 'Hello world! ' * 10} for i in range(100)]).encode()
+
+
+@override_settings(API_COMPRESSION={
+    'MIN_SIZE': 200,
+    'PATH_PREFIXES': ['/api/'],
+    'CONTENT_TYPES': ['application/json'],
+    'LEVELS': {},
+})
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _get(self, response, path='/api/posts/', accept_encoding='gzip'):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get(path, HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    ### VALID
+    def test_large_json_is_gzipped(self):
+        """Confirms that large JSON bodies are gzipped and decompress to the original"""
+        response = self._get(HttpResponse(LARGE_BODY, content_type='application/json'))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), LARGE_BODY)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        """Confirms that every chunk of a streaming response is emitted compressed as it arrives"""
+        chunks = [LARGE_BODY[i:i + 1000] for i in range(0, len(LARGE_BODY), 1000)]
+        response = self._get(StreamingHttpResponse(iter(chunks), content_type='application/json'))
+
+        compressed = list(response.streaming_content)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertGreater(len(compressed), 1)
+        self.assertEqual(gzip.decompress(b''.join(compressed)), LARGE_BODY)
+
+    def test_client_preference_wins(self):
+        """Confirms that the encoding with the highest q-value is chosen"""
+        codecs = {'br': None, 'zstd': None, 'gzip': None}
+
+        self.assertEqual(compression.choose_encoding('gzip;q=1.0, br;q=0.5', codecs), 'gzip')
+        self.assertEqual(compression.choose_encoding('gzip, br, zstd', codecs), 'br')
+        self.assertEqual(compression.choose_encoding('*', codecs), 'br')
+        self.assertEqual(compression.choose_encoding('br;q=0, *;q=0.1', codecs), 'zstd')
+
+    ### INVALID
+    def test_small_response_is_untouched(self):
+        body = b'{"id": 1}'
+        response = self._get(HttpResponse(body, content_type='application/json'))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, body)
+
+    def test_client_without_accepted_encoding(self):
+        response = self._get(HttpResponse(LARGE_BODY, content_type='application/json'), accept_encoding='identity')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_other_routes_and_content_types_are_untouched(self):
+        """Confirms that only the configured paths and content types are compressed"""
+        outside = self._get(HttpResponse(LARGE_BODY, content_type='application/json'), path='/admin/')
+        html = self._get(HttpResponse(LARGE_BODY, content_type='text/html'))
+
+        self.assertFalse(outside.has_header('Content-Encoding'))
+        self.assertFalse(html.has_header('Content-Encoding'))
+
+
+class OptionalCodecTests(SimpleTestCase):
+    """The codecs which need optional packages, each one is skipped when its package is missing"""
+    def _roundtrip(self, codec, decompress):
+        self.assertEqual(decompress(codec.compress(LARGE_BODY)), LARGE_BODY)
+
+        compressor = codec.compressor()
+        parts = [codec.compress_chunk(compressor, LARGE_BODY[:3000]), codec.compress_chunk(compressor, LARGE_BODY[3000:])]
+        parts.append(codec.finish(compressor))
+        self.assertEqual(decompress(b''.join(parts)), LARGE_BODY)
+
+    def test_brotli(self):
+        if compression.brotli is None:
+            self.skipTest('brotli is not installed')
+        self._roundtrip(compression.BrotliCodec(4), compression.brotli.decompress)
+
+    def test_zstd(self):
+        if compression.zstandard is None:
+            self.skipTest('zstandard is not installed')
+        decompressor = compression.zstandard.ZstdDecompressor()
+        # streamed frames don't record their size, so decompress with an explicit limit
+        self._roundtrip(compression.ZstdCodec(3), lambda data: decompressor.decompress(data, max_output_size=len(LARGE_BODY)))
@@ -0,0 +1,69 @@
+import os
+import tempfile
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from ...middleware import make_profiling_token
+
+
+class ProfilingMiddlewareTests(APITestCase):
+    def setUp(self):
+        # every test gets its own output directory so we can count the written files
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output_dir.cleanup)
+        self.url = reverse('post-list')
+
+    def _written_files(self):
+        return sorted(os.listdir(self.output_dir.name))
+
+    ### VALID
+    def test_signed_header_profiles_request(self):
+        """Confirms that a valid signed token writes the profile, allocations and SQL of the request"""
+        with override_settings(PROFILING_DIR=self.output_dir.name):
+            response = self.client.get(self.url, HTTP_X_PROFILE_TOKEN=make_profiling_token())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        name = response['X-Profile-Id']
+        self.assertEqual(self._written_files(), [f'{name}.alloc.txt', f'{name}.prof', f'{name}.sql.txt'])
+
+        # the post list query should show up in the sql report
+        with open(os.path.join(self.output_dir.name, f'{name}.sql.txt')) as f:
+            self.assertIn('posts_post', f.read())
+
+    def test_staff_query_parameter_profiles_request(self):
+        """Confirms that staff users logged in via session can trigger profiling with ?profile=1"""
+        User.objects.create_user(username='staff', password='secure_password123', is_staff=True)
+        self.client.login(username='staff', password='secure_password123')
+
+        with override_settings(PROFILING_DIR=self.output_dir.name):
+            response = self.client.get(self.url, {'profile': 1})
+
+        self.assertIn('X-Profile-Id', response)
+
+    ### INVALID
+    def test_untriggered_request_is_not_profiled(self):
+        """Confirms that ordinary requests pass through without writing anything"""
+        with override_settings(PROFILING_DIR=self.output_dir.name):
+            response = self.client.get(self.url)
+
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self._written_files(), [])
+
+    def test_forged_token_is_ignored(self):
+        """Confirms that a token with a wrong signature does not trigger profiling"""
+        with override_settings(PROFILING_DIR=self.output_dir.name):
+            response = self.client.get(self.url, HTTP_X_PROFILE_TOKEN='profile:forged:signature')
+
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_non_staff_query_parameter_is_ignored(self):
+        """Confirms that regular users can not trigger profiling via the query parameter"""
+        User.objects.create_user(username='user', password='secure_password123')
+        self.client.login(username='user', password='secure_password123')
+
+        with override_settings(PROFILING_DIR=self.output_dir.name):
+            response = self.client.get(self.url, {'profile': 1})
+
+        self.assertNotIn('X-Profile-Id', response)
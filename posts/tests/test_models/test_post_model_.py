@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
-from ...models import Post
+from ...models import Post, EXCERPT_LENGTH
 from django.utils import timezone
 from datetime import timedelta
 
@@ -34,3 +34,33 @@ class PostModelTests(TestCase):
             now, 
             delta=timedelta(minutes=1)
         )
+
+    def test_excerpt_of_short_text_is_the_text(self):
+        """Verify that texts shorter than the excerpt length are stored unchanged as excerpt"""
+        self.assertEqual(self.post.excerpt, "This is a test")
+
+    def test_excerpt_cuts_long_text_at_word_boundary(self):
+        """Verify that long texts are cut at a word boundary and marked with an ellipsis"""
+        self.post.text_content = "word " * 200
+        self.post.save(update_fields=['text_content'])
+        self.post.refresh_from_db()
+
+        self.assertLessEqual(len(self.post.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(self.post.excerpt.endswith("word…"))
+
+    def test_new_post_starts_with_its_own_activity(self):
+        """Verify that a new post has no comments and its creation time as last activity"""
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(self.post.last_activity_at, self.post.timestamp)
+
+    def test_saving_a_stale_copy_keeps_the_counters(self):
+        """Verify that saving an instance loaded before a comment was added doesn't reset the counters"""
+        stale = Post.objects.get(pk=self.post.pk)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=1)
+
+        stale.title = "Edited title"
+        stale.save()
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.post.title, "Edited title")
+        self.assertEqual(self.post.comment_count, 1)
@@ -0,0 +1,87 @@
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from ... import renderers
+from ...models import Post
+from ...parsers import FastJSONParser
+
+DATA = {
+    'id': 1,
+    'title': 'Ünïcödé title with emoji 🎉',
+    'text_content': 'line separator \u2028 and paragraph separator \u2029 and "quotes"',
+    'timestamp': datetime.datetime(2026, 1, 13, 11, 21, 5, 123456, tzinfo=datetime.timezone.utc),
+    'date': datetime.date(2026, 1, 13),
+    'price': Decimal('1.50'),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'comments': [{'id': 2, 'nested': {3: 'integer key'}}],
+    'image': None,
+    'flag': True,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_output_matches_json_renderer(self):
+        """Confirms that the output is byte for byte the same as the one of DRF's JSONRenderer"""
+        self.assertEqual(renderers.FastJSONRenderer().render(DATA), JSONRenderer().render(DATA))
+
+    def test_indented_output_matches_json_renderer(self):
+        """Confirms that indentation requests (e.g. from the browsable API) produce the same output"""
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(DATA, 'application/json; indent=4'),
+            JSONRenderer().render(DATA, 'application/json; indent=4'),
+        )
+
+    def test_empty_data(self):
+        self.assertEqual(renderers.FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def test_parses_like_json_parser(self):
+        body = json.dumps({'title': 'Ünïcödé', 'numbers': [1, 2.5], 'nothing': None}).encode()
+
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_invalid_json_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"title": '))
+
+    def test_nan_is_rejected(self):
+        """Confirms that NaN is refused like in the strict JSONParser"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"value": NaN}'))
+
+
+class MessagePackTests(APITestCase):
+    def setUp(self):
+        if renderers.msgpack is None:
+            self.skipTest('msgpack is not installed')
+        self.user = User.objects.create_user(username='author', password='secure_password123')
+        Post.objects.create(title="Some Post", text_content="Hello world, this is a post!", author=self.user)
+        self.url = reverse('post-list')
+
+    def test_list_as_msgpack(self):
+        """Confirms that clients asking for MessagePack get the same data as JSON clients"""
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(response.content), self.client.get(self.url).json())
+
+    def test_create_post_from_msgpack(self):
+        """Confirms that MessagePack request bodies are parsed"""
+        self.client.force_authenticate(user=self.user)
+        body = renderers.msgpack.packb({'title': 'Packed Post', 'text_content': 'A' * 15})
+
+        response = self.client.post(self.url, body, content_type='application/msgpack')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Post.objects.filter(title='Packed Post').exists())
@@ -0,0 +1,74 @@
+import random
+from django.core.exceptions import SuspiciousOperation
+from django.test import SimpleTestCase
+from django.utils import html
+from ... import sanitization
+
+# building blocks for the fuzzing corpus, a mix of text, markup and all the things the HTMLParser treats specially
+FRAGMENTS = [
+    'hello', 'amp', 'A', 'b', 'x', '1', ' ', '\n', '\t', '\r', '\x00', 'é', '/', '=', '"', "'", '`', ';', '#',
+    '&', '!', '-', '?', '.', '<', '>', '</', '/>', '="', "='", '<b>', '</b>', '<p>', '</p>', '<br/>',
+    '<a href="x">', '<a b="x>y">', '</a>', '<img src=x alt=\'y\'>', '&amp;', '&#39;', '&#x2F;', '&T ',
+    '<!--', '-->', '<![CDATA[', ']]>', '<?', '<!DOCTYPE html>', 'script', 'Script', 'style', 'TITLE',
+]
+
+
+def django_strip_tags(value):
+    try:
+        return html.strip_tags(value)
+    except SuspiciousOperation:
+        return SuspiciousOperation
+
+
+def fast_strip_tags(value):
+    try:
+        return sanitization.strip_tags(value)
+    except SuspiciousOperation:
+        return SuspiciousOperation
+
+
+class StripTagsTests(SimpleTestCase):
+    ### VALID
+    def test_plain_text_is_returned_unchanged(self):
+        text = 'Nothing to strip here, 3 > 2 & 1 < 2'
+        self.assertIs(sanitization.strip_tags(text), text)
+
+    def test_everyday_markup(self):
+        self.assertEqual(sanitization.strip_tags('<p>Hello <b>World</b>!</p>'), 'Hello World!')
+        self.assertEqual(sanitization.strip_tags('<a href="/x?a=1&amp;b=2" title="a > b">link</a>'), 'link')
+        self.assertEqual(sanitization.strip_tags('Fish &amp; chips<br/>'), 'Fish &amp; chips')
+
+    def test_same_output_as_django_on_fuzzing_corpus(self):
+        """Confirms that the output (or the SuspiciousOperation) matches django's strip_tags for random markup soup"""
+        rng = random.Random(37)
+        for _ in range(20_000):
+            value = ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 30)))
+            self.assertEqual(fast_strip_tags(value), django_strip_tags(value), msg=repr(value))
+
+    def test_same_output_as_django_on_long_unclosed_tags(self):
+        """Confirms that long runs of unclosed tags (which django rejects past a length) come out like in django"""
+        rng = random.Random(37)
+        fragments = ['<a', '<b ', 'x', ' ', '=', '"', '<', '&amp;']
+        for _ in range(200):
+            value = ''.join(rng.choice(fragments) for _ in range(rng.randint(300, 1500)))
+            if rng.random() < 0.3:
+                value += '>'
+            self.assertEqual(fast_strip_tags(value), django_strip_tags(value), msg=repr(value[:50]))
+
+    ### INVALID
+    def test_edge_cases_are_left_to_django(self):
+        """Confirms that comments, raw text elements, unusual ampersands and broken tags come out like in django"""
+        values = [
+            '<!-- <b>hidden</b> -->text',
+            '<script>if (a < b) alert(1)</script>',
+            '<title><b>x</b></title>',
+            'AT&T <b>rocks</b>',
+            '<<b>b>nested</b>',
+            '<a title=\'x" y\'>z</a',
+            '<a' * 60 + '>',
+            # no '>' at all, django raises a SuspiciousOperation for this
+            '<a' * 600,
+            '1 < 2 <b',
+        ]
+        for value in values:
+            self.assertEqual(fast_strip_tags(value), django_strip_tags(value), msg=repr(value))
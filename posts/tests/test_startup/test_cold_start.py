@@ -0,0 +1,42 @@
+import importlib
+import subprocess
+import sys
+from django.conf import settings
+from django.test import SimpleTestCase
+from ... import startup
+
+
+class ColdStartTests(SimpleTestCase):
+    ### VALID
+    def test_cold_start_stays_within_budget(self):
+        """Confirms that django.setup() plus loading the urls in a fresh interpreter takes at most STARTUP_BUDGET"""
+        result = startup.measure(repeat=3)
+        slowest = sorted(result['modules'].items(), key=lambda item: item[1][0], reverse=True)[:10]
+        self.assertLessEqual(
+            result['phases']['total'], settings.STARTUP_BUDGET,
+            msg='slowest modules (self time): ' + ', '.join(f'{name} {own * 1000:.1f}ms' for name, (own, _) in slowest),
+        )
+        # the project's own modules are part of the measurement
+        self.assertIn('config.settings', result['modules'])
+        self.assertIn('posts.views', result['modules'])
+
+    def test_profanity_list_is_not_read_on_startup(self):
+        """Confirms that loading the urls (and with them the serializers) doesn't read the profanity list yet"""
+        code = (
+            'import django; django.setup()\n'
+            'from django.urls import get_resolver; get_resolver().url_patterns\n'
+            'from posts import serializers; print(serializers.load_profane_words.cache_info().currsize)\n'
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), '0')
+
+    def test_timer_sees_modules_loaded_with_import_module(self):
+        sys.modules.pop('colorsys', None)
+        timer = startup.ImportTimer()
+        timer.install()
+        try:
+            importlib.import_module('colorsys')
+        finally:
+            timer.uninstall()
+        own, cumulative = timer.timings['colorsys']
+        self.assertLessEqual(own, cumulative)
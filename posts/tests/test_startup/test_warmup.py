@@ -0,0 +1,74 @@
+import gc
+import logging
+import os
+import runpy
+from unittest import mock
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from ... import warmup
+
+GUNICORN_CONFIG = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+
+
+class WarmupTests(TestCase):
+    ### VALID
+    def test_every_step_is_timed(self):
+        timings = warmup.warm_up()
+        self.assertEqual(list(timings), [name for name, _ in warmup.STEPS])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+    def test_steps_before_the_database_check_do_not_query(self):
+        """Confirms that warming up urls, serializers and validators doesn't run a single query"""
+        with self.assertNumQueries(0):
+            for name, step in warmup.STEPS:
+                if name != 'databases':
+                    step()
+
+    ### INVALID
+    def test_unreachable_database_fails_the_warmup(self):
+        """Confirms that the master stops before forking when a database can't be reached"""
+        with mock.patch.object(connection, 'ensure_connection', side_effect=RuntimeError('unreachable')):
+            with self.assertRaises(RuntimeError):
+                warmup.warm_databases()
+
+
+class GunicornConfigTests(TestCase):
+    def load_config(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(GUNICORN_CONFIG)
+
+    ### VALID
+    def test_preloads_and_warms_up_by_default(self):
+        config = self.load_config()
+        self.assertEqual(config['wsgi_app'], 'config.wsgi:application')
+        self.assertTrue(config['preload_app'])
+        self.assertTrue(config['warmup'])
+
+    def test_when_ready_warms_up_and_freezes_the_heap(self):
+        """Confirms that the master warms up before forking and moves its objects out of the collector's reach"""
+        config = self.load_config()
+        server = mock.Mock(log=logging.getLogger('gunicorn.test'))
+        try:
+            with mock.patch('posts.warmup.warm_up', return_value={'urls': 0.001}) as warm_up:
+                config['when_ready'](server)
+            warm_up.assert_called_once()
+            self.assertGreater(gc.get_freeze_count(), 0)
+        finally:
+            gc.unfreeze()
+
+    def test_without_preload_every_worker_warms_up(self):
+        config = self.load_config(GUNICORN_PRELOAD='False')
+        with mock.patch('posts.warmup.warm_up', return_value={}) as warm_up:
+            config['when_ready'](mock.Mock())
+            warm_up.assert_not_called()
+            config['post_worker_init'](mock.Mock(log=logging.getLogger('gunicorn.test')))
+            warm_up.assert_called_once()
+
+    ### INVALID
+    def test_warmup_can_be_switched_off(self):
+        config = self.load_config(GUNICORN_WARMUP='False')
+        with mock.patch('posts.warmup.warm_up') as warm_up:
+            config['when_ready'](mock.Mock())
+        warm_up.assert_not_called()
+        gc.unfreeze()
@@ -0,0 +1,176 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ... import tasks
+from ...deletion import hide_post
+from ...models import Comment, Post, Task
+
+TASK_QUEUE = {
+    'WORKERS': 2,
+    'MAX_PENDING': 10,
+    'MAX_RETRIES': 2,
+    'RETRY_BACKOFF': 0.01,
+    'LOCK_TIMEOUT': 300,
+    'EAGER': False,
+}
+
+calls = []
+done = threading.Event()
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+    done.set()
+
+
+@tasks.task
+def flaky(failures):
+    """Fails the first `failures` calls"""
+    calls.append('attempt')
+    if len(calls) <= failures:
+        raise RuntimeError('not yet')
+    done.set()
+
+
+def not_a_task():
+    pass
+
+
+@override_settings(TASK_QUEUE=TASK_QUEUE)
+class ThreadQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        done.clear()
+        # a fresh pool and fresh stats per test, the module's own queue is back afterwards
+        queue = tasks.ThreadQueue()
+        patcher = mock.patch.object(tasks, 'thread_queue', queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: queue.executor is not None and queue.executor.shutdown(wait=True))
+
+    ### VALID
+    def test_task_runs_after_commit(self):
+        """Confirms that a task only starts once the transaction commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            record.enqueue('hello')
+            self.assertEqual(calls, [])
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(calls, ['hello'])
+
+    def test_failed_task_is_retried(self):
+        """Confirms that a failing task is retried with backoff and counted"""
+        with self.assertLogs('posts.tasks', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                flaky.enqueue(2)
+            self.assertTrue(done.wait(5))
+
+        self.assertEqual(len(calls), 3)
+        stats = tasks.thread_queue.stats()
+        self.assertEqual((stats['enqueued'], stats['retried'], stats['succeeded']), (1, 2, 1))
+
+    @override_settings(TASK_QUEUE={**TASK_QUEUE, 'MAX_PENDING': 0})
+    def test_full_queue_runs_inline(self):
+        """Confirms that tasks beyond MAX_PENDING run in the caller instead of piling up"""
+        with self.captureOnCommitCallbacks(execute=True):
+            record.enqueue('inline')
+
+        self.assertEqual(calls, ['inline'])
+        self.assertEqual(tasks.thread_queue.stats()['ran_inline'], 1)
+
+    @override_settings(TASK_QUEUE={**TASK_QUEUE, 'EAGER': True})
+    def test_eager_mode(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.enqueue(1)
+
+        self.assertEqual(calls, ['attempt', 'attempt'])
+
+    ### INVALID
+    def test_rolled_back_task_never_runs(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    record.enqueue('rolled back')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(calls, [])
+
+
+@override_settings(TASK_QUEUE=TASK_QUEUE)
+class PersistentQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        done.clear()
+
+    ### VALID
+    def test_worker_runs_stored_tasks(self):
+        """Confirms that persistent tasks are stored and the worker runs and removes them"""
+        record.enqueue('stored', persistent=True)
+        self.assertEqual(Task.objects.get().name, record.task_name)
+
+        out = StringIO()
+        call_command('run_tasks', stdout=out)
+
+        self.assertIn('Ran 1 tasks, 0 failed', out.getvalue())
+        self.assertEqual(calls, ['stored'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_deleted_post_is_purged_by_task(self):
+        """Confirms that deleting a post queues the purge of its comments"""
+        user = User.objects.create_user(username='author', password='some_password')
+        post = Post.objects.create(author=user, title="Deleted", text_content="This post gets deleted")
+        Comment.objects.create(parent_post=post, author=user, text_content="A comment on the post")
+        hide_post(post)
+
+        tasks.run_persistent_tasks()
+
+        self.assertFalse(Post.all_objects.filter(pk=post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_orphaned_task_is_claimed_again(self):
+        """Confirms that a task of a crashed worker is picked up after the lock timeout"""
+        record.enqueue('orphaned', persistent=True)
+        Task.objects.update(status=Task.RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+
+        tasks.run_persistent_tasks()
+
+        self.assertEqual(calls, ['orphaned'])
+
+    ### INVALID
+    def test_failed_task_backs_off_and_finally_fails(self):
+        """Confirms that a failing task is scheduled again with a delay and marked failed after the last retry"""
+        flaky.enqueue(10, persistent=True)
+
+        with self.assertLogs('posts.tasks', 'ERROR'):
+            self.assertEqual(tasks.run_persistent_tasks(), (0, 1))
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts), (Task.PENDING, 1))
+        self.assertGreater(row.run_after, timezone.now())
+        self.assertIn('not yet', row.last_error)
+
+        with self.assertLogs('posts.tasks', 'ERROR'):
+            for _ in range(TASK_QUEUE['MAX_RETRIES']):
+                Task.objects.update(run_after=timezone.now())
+                tasks.run_persistent_tasks()
+
+        row = Task.objects.get()
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 3))
+        # failed tasks are left alone
+        self.assertEqual(tasks.run_persistent_tasks(), (0, 0))
+
+    def test_only_registered_functions_run(self):
+        Task.objects.create(name=f'{__name__}.not_a_task')
+
+        with self.assertLogs('posts.tasks', 'ERROR'):
+            self.assertEqual(tasks.run_persistent_tasks(), (0, 1))
+        self.assertIn('is not a registered task', Task.objects.get().last_error)
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import timeit
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from ... import throttling
+from ...test_runner import TestRunner
+from ...models import Post
+
+RATES = {'login': '3/min', 'login_username': '100/min', 'register': '100/hour', 'comment': '2/min'}
+
+
+class SlidingWindowStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.store = throttling.SlidingWindowStore(None, 1024)
+
+    ### VALID
+    def test_limit_within_window(self):
+        """Confirms that the limit is enforced and the rejection says when to come back"""
+        results = [self.store.hit('client', 3, 60, now=6000 + i) for i in range(4)]
+
+        self.assertEqual([allowed for allowed, _ in results], [True, True, True, False])
+        # the 3 requests only start sliding out of the window at the next window
+        self.assertAlmostEqual(results[-1][1], 60 - 3 + 20)
+
+    def test_previous_window_slides_out(self):
+        """Confirms that the previous window counts less the further the current one progresses"""
+        for _ in range(4):
+            self.store.hit('client', 4, 60, now=6030)
+
+        # 3/4 of the previous window still overlap: 4 * 0.75 = 3, one more fits
+        self.assertEqual(self.store.hit('client', 4, 60, now=6075)[0], True)
+        self.assertEqual(self.store.hit('client', 4, 60, now=6075)[0], False)
+        # half way: 4 * 0.5 + 1 = 3
+        self.assertEqual(self.store.hit('client', 4, 60, now=6090)[0], True)
+
+    def test_shared_between_processes(self):
+        """Confirms that two stores on the same file (like two gunicorn workers) count together"""
+        path = os.path.join(tempfile.mkdtemp(), 'throttle')
+        first, second = throttling.SlidingWindowStore(path, 1024), throttling.SlidingWindowStore(path, 1024)
+        self.addCleanup(os.remove, path)
+
+        first.hit('client', 2, 60, now=6000)
+        second.hit('client', 2, 60, now=6001)
+
+        self.assertEqual(first.hit('client', 2, 60, now=6002)[0], False)
+
+    def test_check_is_fast(self):
+        """Confirms that a check costs well under 50 microseconds"""
+        path = os.path.join(tempfile.mkdtemp(), 'throttle')
+        store = throttling.SlidingWindowStore(path, 1024)
+        self.addCleanup(os.remove, path)
+
+        seconds = min(timeit.repeat(lambda: store.hit('client', 10 ** 9, 60), number=2000, repeat=5)) / 2000
+        self.assertLess(seconds, 50e-6)
+
+    ### INVALID
+    def test_keys_do_not_interfere(self):
+        """Confirms that keys are counted apart even when the table is too small for all of them"""
+        store = throttling.SlidingWindowStore(None, 4)
+        for key in ('a', 'b', 'c'):
+            store.hit(key, 1, 60, now=6000)
+
+        self.assertEqual(store.hit('a', 1, 60, now=6001)[0], False)
+        self.assertEqual(store.hit('d', 1, 60, now=6001)[0], True)
+
+
+class TestRunnerTests(SimpleTestCase):
+    ### VALID
+    def test_tests_count_in_private_memory(self):
+        """Confirms that the test runner keeps the tests out of the shared table"""
+        self.assertIsNone(throttling.get_store().path)
+
+    def test_counts_are_reset_after_every_test(self):
+        """Confirms that every test gets a cleanup which forgets the counts"""
+        suite = TestRunner(verbosity=0).build_suite(['posts.tests.test_throttling.test_throttling.TestRunnerTests'])
+        test = next(iter(suite))
+        throttling.get_store().hit('client', 1, 60)
+
+        test.doCleanups()
+
+        self.assertTrue(throttling.get_store().hit('client', 1, 60)[0])
+
+    ### INVALID
+    def test_shared_table_is_not_reset(self):
+        """Confirms that resetting never wipes a table other processes count in"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'throttle')
+            with override_settings(THROTTLE_STORE={**settings.THROTTLE_STORE, 'PATH': path, 'SHARED': True}):
+                throttling.get_store().hit('client', 1, 60)
+                throttling.reset_store()
+
+                self.assertFalse(throttling.get_store().hit('client', 1, 60)[0])
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': RATES})
+class ThrottledViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='some_password')
+        self.addCleanup(throttling.get_store().clear)
+
+    ### VALID
+    def test_comment_reads_are_not_throttled(self):
+        post = Post.objects.create(author=self.user, title="Some Post", text_content="Hello world!")
+        url = reverse('comment-list', kwargs={'post_pk': post.pk})
+
+        for _ in range(5):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    ### INVALID
+    def test_login_flood_is_rejected(self):
+        """Confirms that too many login attempts from one IP get a 429 with Retry-After"""
+        data = {'username': 'user', 'password': 'wrong_password'}
+        for _ in range(3):
+            self.assertEqual(self.client.post(reverse('auth-login'), data, REMOTE_ADDR='10.0.0.1').status_code, 400)
+
+        response = self.client.post(reverse('auth-login'), data, REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # another client is not affected
+        self.assertEqual(self.client.post(reverse('auth-login'), data, REMOTE_ADDR='10.0.0.2').status_code, 400)
+
+    def test_comment_flood_is_rejected_per_user(self):
+        post = Post.objects.create(author=self.user, title="Some Post", text_content="Hello world!")
+        url = reverse('comment-list', kwargs={'post_pk': post.pk})
+        data = {'parent_post': post.pk, 'text_content': 'This is a long enough comment'}
+        self.client.force_authenticate(user=self.user)
+
+        statuses = [self.client.post(url, data, format='json').status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [200, 200, 429])
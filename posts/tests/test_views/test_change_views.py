@@ -0,0 +1,119 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from ...models import Change, Comment, Post
+
+
+@override_settings(CHANGE_FEED={**settings.CHANGE_FEED, 'SETTLE': 0})
+class ChangeFeedTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='secure_password123')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('change-list')
+
+    def _create_post(self, title="Some Post"):
+        response = self.client.post(reverse('post-list'), {'title': title, 'text_content': "Hello world, this is the text"}, format='json')
+        return response.data['id']
+
+    def _create_comment(self, post_pk, text_content="This is a long enough comment"):
+        url = reverse('comment-list', kwargs={'post_pk': post_pk})
+        return self.client.post(url, {'parent_post': post_pk, 'text_content': text_content}, format='json').data['id']
+
+    def _sync(self, since=0, **params):
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    ### VALID
+    def test_creates_updates_and_deletes_after_the_token(self):
+        """Confirms that only the changes after the token are returned, each with the current data"""
+        post_pk = self._create_post()
+        comment_pk = self._create_comment(post_pk)
+        token = self._sync()['next']
+
+        self.client.patch(reverse('post-detail', kwargs={'pk': post_pk}), {'title': "A new heading"}, format='json')
+        self.client.delete(reverse('comment-detail', kwargs={'pk': comment_pk}))
+        other_pk = self._create_post("Another Post")
+
+        page = self._sync(token)
+        self.assertFalse(page['has_more'])
+        self.assertEqual(
+            [(change['type'], change['id'], change['action']) for change in page['changes']],
+            [('post', post_pk, 'update'), ('comment', comment_pk, 'delete'), ('post', other_pk, 'create')],
+        )
+        self.assertEqual(page['changes'][0]['data']['title'], "A New Heading")
+        self.assertNotIn('comments', page['changes'][0]['data'])
+        self.assertIsNone(page['changes'][1]['data'])
+        self.assertEqual(self._sync(page['next'])['changes'], [])
+
+    def test_bounded_pages(self):
+        """Confirms that the pages are limited and chained through the next token"""
+        post_pks = [self._create_post(f"Post number {i}") for i in range(5)]
+
+        first = self._sync(limit=3)
+        self.assertTrue(first['has_more'])
+        second = self._sync(first['next'], limit=3)
+        self.assertFalse(second['has_more'])
+        self.assertEqual([change['id'] for change in first['changes'] + second['changes']], post_pks)
+
+    def test_object_changed_twice_appears_once(self):
+        post_pk = self._create_post()
+        self.client.patch(reverse('post-detail', kwargs={'pk': post_pk}), {'title': "A new heading"}, format='json')
+
+        changes = self._sync()['changes']
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]['action'], 'update')
+        self.assertEqual(changes[0]['change'], Change.objects.latest('pk').pk)
+
+    def test_deleted_post_takes_its_comments_along(self):
+        """Confirms that a hidden post and its not yet purged comments are reported as deleted"""
+        post_pk = self._create_post()
+        comment_pk = self._create_comment(post_pk)
+        self.client.delete(reverse('post-detail', kwargs={'pk': post_pk}))
+
+        changes = {(change['type'], change['id']): change for change in self._sync()['changes']}
+        self.assertEqual(changes['post', post_pk]['action'], 'delete')
+        self.assertEqual(changes['comment', comment_pk]['action'], 'delete')
+
+    def test_change_is_logged_in_the_same_transaction(self):
+        """Confirms that saves are logged and that a rolled back save leaves no log entry behind"""
+        post = Post.objects.create(title="Some Post", text_content="Hello world!", author=self.user)
+        comment = Comment.objects.create(parent_post=post, author=self.user, text_content="A comment")
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Comment.objects.create(parent_post=post, author=self.user, text_content="A rolled back comment")
+            raise RuntimeError
+        self.assertEqual(
+            list(Change.objects.values_list('kind', 'object_id', 'action')),
+            [('post', post.pk, 'create'), ('comment', comment.pk, 'create')],
+        )
+
+    @override_settings(CHANGE_FEED={**settings.CHANGE_FEED, 'SETTLE': 60})
+    def test_page_ends_before_the_first_unsettled_change(self):
+        """Confirms that a settled change behind an unsettled one is not returned, so the token doesn't skip the unsettled one"""
+        post_pks = [self._create_post(f"Post number {i}") for i in range(3)]
+        changes = list(Change.objects.order_by('pk'))
+        Change.objects.filter(pk__in=[changes[0].pk, changes[2].pk]).update(created_at=timezone.now() - timedelta(minutes=5))
+
+        page = self._sync()
+        self.assertEqual([change['id'] for change in page['changes']], post_pks[:1])
+        self.assertEqual(page['next'], changes[0].pk)
+        self.assertFalse(page['has_more'])
+
+    ### INVALID
+    @override_settings(CHANGE_FEED={**settings.CHANGE_FEED, 'SETTLE': 60})
+    def test_recent_changes_are_held_back(self):
+        self._create_post()
+        page = self._sync()
+        self.assertEqual(page['changes'], [])
+        self.assertEqual(page['next'], 0)
+
+    def test_invalid_token(self):
+        for params in ({'since': 'abc'}, {'since': -1}, {'limit': 0}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
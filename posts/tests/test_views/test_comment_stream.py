@@ -0,0 +1,182 @@
+import asyncio
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from ... import events
+from ...models import Post, Comment
+
+COMMENT_STREAM = {**settings.COMMENT_STREAM, 'BUFFER': 2, 'HEARTBEAT': 5, 'POLL_INTERVAL': None}
+
+
+async def empty_stream():
+    yield 'retry: 3000\n\n'
+
+
+@override_settings(COMMENT_STREAM=COMMENT_STREAM)
+class CommentStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='secure_password123')
+        self.post = Post.objects.create(title="Some Post", text_content="Hello world!", author=self.user)
+        self.comment = Comment.objects.create(parent_post=self.post, author=self.user, text_content="The first comment")
+        self.url = reverse('comment-stream', kwargs={'post_pk': self.post.pk})
+
+    def tearDown(self):
+        events.hub.subscribers.clear()
+        # ids are reused once the test transaction is rolled back
+        events.hub.published.clear()
+        if events.hub.poller is not None:
+            events.hub.poller.cancel()
+            events.hub.poller = None
+
+    async def _next(self, chunks):
+        chunk = await asyncio.wait_for(anext(chunks), 5)
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+    @sync_to_async
+    def _create_and_publish(self, text_content):
+        comment = Comment.objects.create(parent_post=self.post, author=self.user, text_content=text_content)
+        events.hub.publish_comment(comment)
+        return comment
+
+    ### VALID
+    async def test_pushes_new_comments(self):
+        """Confirms that a comment published after connecting arrives as event with its id"""
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await self._next(chunks)).startswith('retry: '))
+
+        comment = await self._create_and_publish("A brand new comment")
+        event = await self._next(chunks)
+        self.assertIn(f'id: {comment.pk}\nevent: comment\n', event)
+        self.assertIn('"text_content":"A brand new comment"', event)
+
+    async def test_closed_stream_unsubscribes(self):
+        stream = events.comment_stream(self.post.pk)
+        await self._next(stream)
+        self.assertEqual(events.hub.count(), 1)
+        await stream.aclose()
+        self.assertEqual(events.hub.count(), 0)
+
+    async def test_resumes_after_last_event_id(self):
+        """Confirms that a reconnecting client first gets the comments it missed, without duplicates"""
+        missed = await sync_to_async(Comment.objects.create)(
+            parent_post=self.post, author=self.user, text_content="Posted while offline",
+        )
+        stream = events.comment_stream(self.post.pk, last_event_id=self.comment.pk)
+        await self._next(stream)
+        self.assertIn(f'id: {missed.pk}\n', await self._next(stream))
+
+        # a late publish of the missed comment is skipped, the next comment comes through
+        await sync_to_async(events.hub.publish_comment)(missed)
+        comment = await self._create_and_publish("After the reconnect")
+        self.assertIn(f'id: {comment.pk}\n', await self._next(stream))
+        await stream.aclose()
+
+    async def test_comment_between_loading_and_connecting_arrives(self):
+        """Confirms that a client passing the newest comment id it loaded gets a comment written before it connected"""
+        # the client loaded self.comment, this one is written before its stream connects
+        gap = await sync_to_async(Comment.objects.create)(parent_post=self.post, author=self.user, text_content="Written in the gap")
+
+        response = await self.async_client.get(self.url, {'last_event_id': self.comment.pk})
+        chunks = aiter(response.streaming_content)
+        await self._next(chunks)
+        self.assertIn(f'id: {gap.pk}\n', await self._next(chunks))
+
+    async def test_resume_header_and_query_parameter(self):
+        for kwargs in ({'headers': {'Last-Event-ID': str(self.comment.pk)}}, {'data': {'last_event_id': self.comment.pk}}):
+            with mock.patch('posts.views.comment_stream', side_effect=lambda *args: empty_stream()) as comment_stream:
+                response = await self.async_client.get(self.url, **kwargs)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            comment_stream.assert_called_once_with(self.post.pk, self.comment.pk)
+
+    @override_settings(COMMENT_STREAM={**COMMENT_STREAM, 'BACKLOG': 1})
+    async def test_too_many_missed_comments_reset_the_client(self):
+        for text_content in ("Missed comment one", "Missed comment two"):
+            await sync_to_async(Comment.objects.create)(parent_post=self.post, author=self.user, text_content=text_content)
+        stream = events.comment_stream(self.post.pk, last_event_id=self.comment.pk)
+        await self._next(stream)
+        self.assertIn('event: reset\n', await self._next(stream))
+        await stream.aclose()
+
+    @override_settings(COMMENT_STREAM={**COMMENT_STREAM, 'HEARTBEAT': 0.01})
+    async def test_idle_clients_get_keep_alives(self):
+        stream = events.comment_stream(self.post.pk)
+        await self._next(stream)
+        self.assertEqual(await self._next(stream), ': keep-alive\n\n')
+        await stream.aclose()
+
+    async def test_slow_client_is_evicted(self):
+        """Confirms that a client whose buffer overflows gets an evicted event and is disconnected"""
+        stream = events.comment_stream(self.post.pk)
+        await self._next(stream)
+        for i in range(3):
+            await self._create_and_publish(f"Comment number {i} of the burst")
+        # give the loop a chance to run the deliveries before the client reads again
+        await asyncio.sleep(0.05)
+        self.assertIn('event: evicted\n', await self._next(stream))
+        with self.assertRaises(StopAsyncIteration):
+            await self._next(stream)
+        self.assertEqual(events.hub.count(), 0)
+
+    @override_settings(COMMENT_STREAM={**COMMENT_STREAM, 'POLL_INTERVAL': 60})
+    async def test_poll_publishes_comments_of_other_processes(self):
+        """Confirms that the poller picks up new comments of subscribed posts once, but not the ones from before the client connected"""
+        chunks = events.comment_stream(self.post.pk)
+        await self._next(chunks)
+        # written by another worker process, nothing is published here
+        comment = await sync_to_async(Comment.objects.create)(
+            parent_post=self.post, author=self.user, text_content="A comment from elsewhere",
+        )
+
+        await sync_to_async(events.hub.poll)()
+        await sync_to_async(events.hub.poll)()
+
+        # self.comment is in the poll window as well, but older than the client
+        self.assertIn(f'id: {comment.pk}\n', await self._next(chunks))
+        subscriber = next(iter(events.hub.subscribers[self.post.pk]))
+        self.assertEqual(subscriber.queue.qsize(), 0)
+        await chunks.aclose()
+
+    ### INVALID
+    def test_not_served_by_wsgi(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    async def test_missing_post(self):
+        response = await self.async_client.get(reverse('comment-stream', kwargs={'post_pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_invalid_last_event_id(self):
+        response = await self.async_client.get(self.url, headers={'Last-Event-ID': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(COMMENT_STREAM={**COMMENT_STREAM, 'MAX_SUBSCRIBERS': 0})
+    async def test_full_worker_rejects_clients(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '30')
+
+
+class CommentPublishTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='secure_password123')
+        self.post = Post.objects.create(title="Some Post", text_content="Hello world!", author=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    ### VALID
+    def test_comment_is_published_after_commit(self):
+        url = reverse('comment-list', kwargs={'post_pk': self.post.pk})
+        with mock.patch.object(events.hub, 'publish_comment') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, {'parent_post': self.post.pk, 'text_content': "Published after the commit"}, format='json')
+                publish.assert_not_called()
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.args[0].pk, response.data['id'])
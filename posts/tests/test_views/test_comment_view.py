@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from ...models import Post, Comment
+
+
+class CommentCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='author',
+            password='secure_password123',
+        )
+        self.post = Post.objects.create(
+            title="Some Post",
+            text_content="Hello world!",
+            author=self.user
+        )
+        self.url = reverse('comment-list', kwargs={'post_pk': self.post.pk})
+        self.client.force_authenticate(user=self.user)
+
+    def _comment(self, text_content="This is a long enough comment"):
+        return self.client.post(self.url, {'parent_post': self.post.pk, 'text_content': text_content}, format='json')
+
+    ### VALID
+    def test_new_comment_updates_post_counters(self):
+        """Confirms that creating a comment increments the comment count and moves the last activity"""
+        response = self._comment()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.post.refresh_from_db()
+        comment = Comment.objects.get(pk=response.data['id'])
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_activity_at, comment.timestamp)
+
+    def test_deleted_comment_updates_post_counters(self):
+        """Confirms that deleting the newest comment decrements the count and falls back to the previous activity"""
+        first = Comment.objects.get(pk=self._comment().data['id'])
+        second = self._comment("This is another long enough comment").data['id']
+
+        response = self.client.delete(reverse('comment-detail', kwargs={'pk': second}))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_activity_at, first.timestamp)
+
+    def test_deleted_comment_with_drifted_count_updates_last_activity(self):
+        """Confirms that a count which drifted to 0 stays at 0 while the last activity is still recomputed"""
+        first = Comment.objects.get(pk=self._comment().data['id'])
+        second = self._comment("This is another long enough comment").data['id']
+        Post.objects.filter(pk=self.post.pk).update(comment_count=0)
+
+        self.client.delete(reverse('comment-detail', kwargs={'pk': second}))
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(self.post.last_activity_at, first.timestamp)
+
+    ### INVALID
+    def test_comment_cannot_move_to_another_post(self):
+        """Confirms that a PATCH ignores parent_post, so the counters of both posts stay right"""
+        comment_pk = self._comment().data['id']
+        other = Post.objects.create(title="Other Post", text_content="Hello world!", author=self.user)
+
+        response = self.client.patch(reverse('comment-detail', kwargs={'pk': comment_pk}), {'parent_post': other.pk}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Comment.objects.get(pk=comment_pk).parent_post_id, self.post.pk)
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.comment_count, other.comment_count), (1, 0))
+
+    def test_invalid_comment_leaves_counters_alone(self):
+        """Confirms that a comment that fails validation doesn't touch the counters"""
+        response = self._comment("Too short")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
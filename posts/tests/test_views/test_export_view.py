@@ -0,0 +1,66 @@
+import gzip
+import json
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from ...models import Post, Comment
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('export')
+        self.staff = User.objects.create_user(username='staff', password='secure_password123', is_staff=True)
+        self.user = User.objects.create_user(username='user', password='secure_password123')
+        self.post = Post.objects.create(author=self.user, title="Exported", text_content="This post is exported")
+        Comment.objects.create(parent_post=self.post, author=self.staff, text_content="A comment to export")
+
+    def _lines(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    ### VALID
+    def test_staff_streams_ndjson(self):
+        """Confirms that staff users get a stream of one post per line with its comments"""
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = self._lines(response)
+        self.assertEqual([record['id'] for record in records], [self.post.pk])
+        self.assertEqual(records[0]['author'], 'user')
+        self.assertEqual(records[0]['comments'][0]['author'], 'staff')
+
+    def test_stream_is_compressed(self):
+        """Confirms that the export is compressed when the client accepts it"""
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        records = [json.loads(line) for line in gzip.decompress(b''.join(response.streaming_content)).splitlines()]
+        self.assertEqual(len(records), 1)
+
+    def test_since_in_the_future_is_empty(self):
+        """Confirms that ?since= limits the export to recent activity"""
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(self.url, {'since': '2999-01-01'})
+
+        self.assertEqual(self._lines(response), [])
+
+    ### INVALID
+    def test_regular_user_is_forbidden(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_since_is_rejected(self):
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(self.url, {'since': 'yesterday'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
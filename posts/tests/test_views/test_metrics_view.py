@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('metrics')
+        self.staff = User.objects.create_user(username='staff', password='secure_password123', is_staff=True)
+        self.user = User.objects.create_user(username='user', password='secure_password123')
+
+    ### VALID
+    def test_staff_sees_metrics(self):
+        """Confirms that staff users get the metrics of the worker process"""
+        self.client.force_authenticate(user=self.staff)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('pid', response.data)
+        # the test database is not pooled
+        self.assertEqual(response.data['database_pools'], {})
+        self.assertIn('enqueued', response.data['tasks']['threads'])
+        self.assertEqual(response.data['tasks']['persistent']['failed'], 0)
+
+    ### INVALID
+    def test_regular_user_is_forbidden(self):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_guest_is_rejected(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,86 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.request import Request
+from ...models import Post, Comment
+from ...preferences import prefers_minimal
+
+
+class MinimalResponseTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author', password='secure_password123')
+        self.client.force_authenticate(user=self.user)
+        self.post = Post.objects.create(author=self.user, title="some post", text_content="Hello world, this is the text")
+        self.comment = Comment.objects.create(parent_post=self.post, author=self.user, text_content="A comment on the post")
+        self.post_url = reverse('post-detail', kwargs={'pk': self.post.pk})
+
+    ### VALID
+    def test_patch_returns_the_written_fields_only(self):
+        """Confirms that Prefer: return=minimal returns the id and the written fields without touching the comments"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.post_url, {'title': "a new heading"}, format='json', HTTP_PREFER='return=minimal')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': self.post.pk, 'title': "A New Heading"})
+        self.assertEqual(response['Preference-Applied'], 'return=minimal')
+        self.assertFalse([query for query in queries if 'FROM "posts_comment"' in query['sql']])
+
+    def test_query_flag_works_like_the_header(self):
+        """Confirms that ?return=minimal works for clients that can't set headers"""
+        response = self.client.post(
+            reverse('post-list') + '?return=minimal',
+            {'title': "Another post", 'text_content': "The text of another post"}, format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(set(response.data), {'id', 'title', 'text_content'})
+        self.assertTrue(Post.objects.filter(pk=response.data['id']).exists())
+
+    def test_put_returns_the_written_fields_only(self):
+        data = {'title': "Some post", 'text_content': "The replaced text of the post", 'image': None}
+
+        response = self.client.put(self.post_url, data, format='json', HTTP_PREFER='return=minimal')
+
+        self.assertEqual(response.data, {'id': self.post.pk, **data, 'title': "Some Post"})
+
+    def test_comment_writes(self):
+        """Confirms that new and updated comments can be returned minimal as well"""
+        response = self.client.post(
+            reverse('comment-list', kwargs={'post_pk': self.post.pk}),
+            {'parent_post': self.post.pk, 'text_content': "This is a long enough comment"}, format='json',
+            HTTP_PREFER='return=minimal',
+        )
+        self.assertEqual(set(response.data), {'id', 'parent_post', 'text_content'})
+        self.assertEqual(response.data['parent_post'], self.post.pk)
+
+        response = self.client.patch(
+            reverse('comment-detail', kwargs={'pk': self.comment.pk}),
+            {'text_content': "<b>An edited comment</b>"}, format='json', HTTP_PREFER='return=minimal',
+        )
+        self.assertEqual(response.data, {'id': self.comment.pk, 'text_content': "An edited comment"})
+
+    def test_full_representation_by_default(self):
+        """Confirms that writes still return the full representation without the preference"""
+        response = self.client.patch(self.post_url, {'title': "a new heading"}, format='json', HTTP_PREFER='return=representation')
+
+        self.assertIn('comments', response.data)
+        self.assertNotIn('Preference-Applied', response)
+
+
+class PreferHeaderTests(SimpleTestCase):
+    def _prefers_minimal(self, header):
+        return prefers_minimal(Request(APIRequestFactory().patch('/', HTTP_PREFER=header)))
+
+    def test_preference_among_others(self):
+        """Confirms that return=minimal is found among other preferences and with parameters"""
+        self.assertTrue(self._prefers_minimal('respond-async, RETURN=minimal; foo="bar"'))
+        self.assertTrue(self._prefers_minimal('return="minimal"'))
+
+    def test_other_preferences(self):
+        self.assertFalse(self._prefers_minimal('return=representation'))
+        self.assertFalse(self._prefers_minimal('respond-async'))
+        self.assertFalse(self._prefers_minimal(''))
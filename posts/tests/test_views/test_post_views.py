@@ -2,7 +2,10 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
-from ...models import Post
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from ...models import Post, Comment
 
 class PostListTests(APITestCase):
     def setUp(self):
@@ -36,6 +39,35 @@ class PostListTests(APITestCase):
         self.assertEqual(len(response.data), 2)
         self.assertEqual(response.data[0]['title'], 'Some Post')
 
+    def test_list_shows_excerpt_without_loading_text(self):
+        """Confirms that the list returns excerpts and doesn't select the full text column"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.data[0]['excerpt'], 'Hello world!')
+        self.assertNotIn('text_content', response.data[0])
+        self.assertNotIn('text_content', queries[0]['sql'])
+
+    def test_list_with_full_body(self):
+        """Confirms that ?body=full includes the complete text of every post"""
+        response = self.client.get(self.url, {'body': 'full'})
+
+        self.assertEqual(response.data[0]['text_content'], 'Hello world!')
+
+    def test_list_ordered_by_activity(self):
+        """Confirms that ?ordering=activity puts the post with the newest comment first"""
+        self.client.force_authenticate(user=self.user)
+        self.client.post(
+            reverse('comment-list', kwargs={'post_pk': self.first_post.pk}),
+            {'parent_post': self.first_post.pk, 'text_content': 'A fresh comment on the first post'},
+            format='json',
+        )
+
+        response = self.client.get(self.url, {'ordering': 'activity'})
+
+        self.assertEqual([post['id'] for post in response.data], [self.first_post.pk, self.second_post.pk])
+        self.assertEqual(response.data[0]['comment_count'], 1)
+
     def test_create_post_authenticated_user(self):
         """Confirms that a logged-in user can successfully create a post"""
         # force_authenticate skips checking credentials and pretends this user is already logged in
@@ -99,6 +131,97 @@ class PostDetailTests(APITestCase):
         self.url = reverse('post-detail', kwargs={'pk': self.post.pk})
         
     ### VALID
-    
-    
-    ### INVALID
\ No newline at end of file
+    def test_delete_hides_post_immediately(self):
+        """Confirms that a deleted post disappears from every read before its comments are purged"""
+        comment = Comment.objects.create(parent_post=self.post, author=self.other_user, text_content="A comment on the post")
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # the rows are still there, waiting for the purge worker
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Comment.objects.filter(pk=comment.pk).exists())
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('post-list')).data, [])
+        comments_url = reverse('comment-list', kwargs={'post_pk': self.post.pk})
+        self.assertEqual(self.client.get(comments_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    ### INVALID
+    def test_delete_by_other_user(self):
+        """Confirms that only the owner can delete a post"""
+        self.client.force_authenticate(user=self.other_user)
+
+        response = self.client.delete(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_comments_of_deleted_post_can_not_be_edited(self):
+        """Confirms that comments of a hidden post can't be changed while they wait for the purge"""
+        comment = Comment.objects.create(parent_post=self.post, author=self.other_user, text_content="A comment on the post")
+        self.client.force_authenticate(user=self.owner)
+        self.client.delete(self.url)
+
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.patch(
+            reverse('comment-detail', kwargs={'pk': comment.pk}),
+            {"text_content": "An edited comment text"},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PostMultiGetTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('post-list')
+        self.user = User.objects.create_user(username='author', password='secure_password123')
+        self.posts = [
+            Post.objects.create(title=f"Post number {i}", text_content="Hello world!", author=self.user) for i in range(3)
+        ]
+        for post in self.posts:
+            Comment.objects.create(parent_post=post, author=self.user, text_content="This is a long enough comment")
+
+    ### VALID
+    def test_posts_in_the_requested_order(self):
+        """Confirms that the posts come back in full, in the order of the ids, with the missing ids reported"""
+        ids = [self.posts[2].pk, 999, self.posts[0].pk, self.posts[2].pk]
+
+        response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['id'] for post in response.data['results']], [self.posts[2].pk, self.posts[0].pk])
+        self.assertEqual(response.data['missing'], [999])
+        self.assertEqual(response.data['results'][0]['text_content'], "Hello world!")
+        self.assertEqual(response.data['results'][0]['comments'][0]['author'], 'author')
+
+    def test_queries_dont_grow_with_the_ids(self):
+        """Confirms that the posts, their authors and their comments are loaded with a fixed number of queries"""
+        ids = ','.join(str(post.pk) for post in self.posts)
+
+        # one query for the posts with their authors, one for the comments with theirs
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'ids': ids})
+
+    def test_deleted_posts_are_missing(self):
+        self.posts[1].deleted_at = self.posts[1].timestamp
+        self.posts[1].save()
+
+        response = self.client.get(self.url, {'ids': str(self.posts[1].pk)})
+
+        self.assertEqual(response.data, {'results': [], 'missing': [self.posts[1].pk]})
+
+    ### INVALID
+    def test_invalid_ids(self):
+        response = self.client.get(self.url, {'ids': '1,two'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MULTI_GET_MAX_IDS=2)
+    def test_too_many_ids(self):
+        """Confirms that the number of ids per request is capped"""
+        response = self.client.get(self.url, {'ids': '1,2,3'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
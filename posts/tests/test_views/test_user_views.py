@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from ...deletion import hide_post
+from ...models import Post, Comment
+
+
+class UserPostListTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='secure_password123')
+        self.other_user = User.objects.create_user(username='other_user', password='secure_password123')
+        self.posts = [
+            Post.objects.create(title=f"Post number {i}", text_content="Hello world!", author=self.author) for i in range(5)
+        ]
+        Post.objects.create(title="Somebody else's post", text_content="Hello world!", author=self.other_user)
+        self.url = reverse('user-post-list', kwargs={'username': 'author'})
+
+    ### VALID
+    def test_pages_through_the_authors_posts(self):
+        """Confirms that following the next links returns every post of the author once, newest first"""
+        ids = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [post['id'] for post in response.data['results']]
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_deleted_posts_are_left_out(self):
+        hide_post(self.posts[0])
+
+        response = self.client.get(self.url)
+
+        self.assertNotIn(self.posts[0].pk, [post['id'] for post in response.data['results']])
+
+    def test_lists_the_authors_comments(self):
+        """Confirms that the comments endpoint only lists the user's comments on visible posts"""
+        visible = Comment.objects.create(parent_post=self.posts[1], author=self.other_user, text_content="A visible comment")
+        Comment.objects.create(parent_post=self.posts[0], author=self.other_user, text_content="A comment to hide")
+        Comment.objects.create(parent_post=self.posts[1], author=self.author, text_content="The author's own comment")
+        hide_post(self.posts[0])
+
+        response = self.client.get(reverse('user-comment-list', kwargs={'username': 'other_user'}))
+
+        self.assertEqual([comment['id'] for comment in response.data['results']], [visible.pk])
+
+    ### INVALID
+    def test_unknown_user(self):
+        response = self.client.get(reverse('user-post-list', kwargs={'username': 'nobody'}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
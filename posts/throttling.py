@@ -0,0 +1,218 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+# key hash, window number, requests in the previous and in the current window, expiry (unix seconds), padding
+SLOT = struct.Struct('<QqIIII')
+# slots tried after the home slot of a key before the stalest one is taken over
+PROBES = 8
+
+
+def default_path():
+    """A file in /dev/shm (memory backed) or the temp dir, with a name unique to this project"""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    project = hashlib.sha1(str(settings.BASE_DIR).encode()).hexdigest()[:12]
+    return os.path.join(directory, f'api-throttle-{project}')
+
+
+class SlidingWindowStore:
+    """
+    Sliding window counters in a fixed size hash table, shared through a memory mapped file
+
+    Every worker process on the host maps the same file, so a client is counted once no matter
+    which worker serves it, without a database or cache round trip. A flock serializes the updates
+    between processes (a thread lock between the threads of one process).
+
+    Each key keeps the number of requests of the current and the previous fixed window. The sliding
+    window count is the current count plus the previous one weighted by how much of it still overlaps,
+    which is accurate enough for rate limits and needs a constant 32 bytes per key.
+    Without a path the table lives in private memory of the process.
+    """
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def _open(self):
+        # after a fork the flock of the inherited file descriptor would be shared with the parent
+        size = self.slots * SLOT.size
+        if self.path is None:
+            self.fd = None
+            self.memory = mmap.mmap(-1, size)
+        else:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self.fd).st_size < size:
+                os.ftruncate(self.fd, size)
+            self.memory = mmap.mmap(self.fd, size)
+        self.pid = os.getpid()
+
+    def _find_slot(self, key_hash):
+        """Returns the offset of the key's slot, or of the free/stalest slot it can take over"""
+        home = key_hash % self.slots
+        candidate, candidate_expiry = None, None
+        for probe in range(PROBES):
+            offset = (home + probe) % self.slots * SLOT.size
+            slot_key, _, _, _, expires, _ = SLOT.unpack_from(self.memory, offset)
+            if slot_key == key_hash:
+                return offset
+            # keep looking even past an expired slot, the key may sit further down the chain
+            if candidate is None or expires < candidate_expiry:
+                candidate, candidate_expiry = offset, expires
+        return candidate
+
+    def hit(self, key, limit, duration, now=None):
+        """
+        Counts a request for `key` if it stays within `limit` requests per `duration` seconds
+
+        Returns (allowed, wait), wait being the seconds until the next request would be allowed.
+        Rejected requests are not counted.
+        """
+        now = time.time() if now is None else now
+        # 0 marks an empty slot
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        window, elapsed = divmod(now, duration)
+        window = int(window)
+
+        with self.lock:
+            if self.pid != os.getpid():
+                self._open()
+            if self.fd is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                offset = self._find_slot(key_hash)
+                slot_key, slot_window, previous, current, _, _ = SLOT.unpack_from(self.memory, offset)
+                if slot_key != key_hash or slot_window < window - 1:
+                    previous, current = 0, 0
+                elif slot_window == window - 1:
+                    previous, current = current, 0
+
+                weight = 1 - elapsed / duration
+                allowed = previous * weight + current + 1 <= limit
+                if allowed:
+                    current += 1
+                # the counts are worthless once the next window has passed
+                expires = (window + 2) * duration
+                SLOT.pack_into(self.memory, offset, key_hash, window, previous, current, int(expires), 0)
+            finally:
+                if self.fd is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+        if allowed:
+            return True, None
+        if current + 1 <= limit:
+            # wait until enough of the previous window has slid out
+            needed = duration * (1 - (limit - 1 - current) / previous)
+            return False, needed - elapsed
+        # wait for the next window, in which the current count is the previous one
+        needed = duration * (1 - (limit - 1) / current) if current else 0
+        return False, duration - elapsed + needed
+
+    def clear(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                self.memory[:] = bytes(len(self.memory))
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        options = settings.THROTTLE_STORE
+        path = (options['PATH'] or default_path()) if options['SHARED'] else None
+        _store = SlidingWindowStore(path, options['SLOTS'])
+    return _store
+
+
+def reset_store():
+    """Forgets the counts of a private store, a shared one is left alone (other processes count in it)"""
+    if _store is not None and _store.path is None:
+        _store.clear()
+
+
+@receiver(setting_changed)
+def store_setting_changed(setting, **kwargs):
+    # the next request builds a store with the new options
+    global _store
+    if setting == 'THROTTLE_STORE':
+        _store = None
+
+
+class SharedRateThrottle(SimpleRateThrottle):
+    """
+    Base class for throttles that count in the shared SlidingWindowStore instead of the cache
+
+    Rejected requests get a 429 with a Retry-After header. Subclasses set the `scope` (the rate comes
+    from DEFAULT_THROTTLE_RATES), implement get_cache_key() and may limit the throttled `methods`.
+    """
+    methods = None
+
+    def get_rate(self):
+        # read at runtime, DRF's class attribute would ignore override_settings
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if self.rate is None or (self.methods is not None and request.method not in self.methods):
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self.retry_after = get_store().hit(key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        # DRF writes Retry-After as a whole number, never tell the client to come back too early
+        return math.ceil(self.retry_after) if self.retry_after is not None else None
+
+
+class SharedIPRateThrottle(SharedRateThrottle):
+    """Counts per client IP (X-Forwarded-For is only used as far as NUM_PROXIES allows)"""
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class SharedUserRateThrottle(SharedRateThrottle):
+    """Counts per user, guests per IP"""
+    def get_cache_key(self, request, view):
+        ident = request.user.pk if request.user and request.user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginRateThrottle(SharedIPRateThrottle):
+    scope = 'login'
+
+
+class LoginUsernameRateThrottle(SharedRateThrottle):
+    """Counts login attempts per username, so guessing one account's password from many IPs is throttled too"""
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': username.lower()}
+
+
+class RegisterRateThrottle(SharedIPRateThrottle):
+    scope = 'register'
+
+
+class CommentRateThrottle(SharedUserRateThrottle):
+    scope = 'comment'
+    methods = ('POST',)
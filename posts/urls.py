@@ -15,6 +15,23 @@ urlpatterns = [
     ### Comment Endpoints
     # list comments for a specific post or add a new comment to it
     path('posts/<int:post_pk>/comments/', views.CommentList.as_view(), name='comment-list'),
+    # new comments of a post as server-sent events (ASGI only)
+    path('posts/<int:post_pk>/comments/stream/', views.CommentStream.as_view(), name='comment-stream'),
     # update or delete a specific comment by its  ID
     path('comments/<int:pk>/', views.CommentDetail.as_view(), name='comment-detail'),
+
+    ### User Endpoints
+    # the posts and comments of one user, newest first with cursor pagination
+    path('users/<str:username>/posts/', views.UserPostList.as_view(), name='user-post-list'),
+    path('users/<str:username>/comments/', views.UserCommentList.as_view(), name='user-comment-list'),
+
+    ### Sync Endpoints
+    # creates, updates and deletes of posts and comments after a token, for offline clients
+    path('changes/', views.ChangeList.as_view(), name='change-list'),
+    # all posts with their comments as NDJSON, for analytics snapshots (staff only)
+    path('export/', views.Export.as_view(), name='export'),
+
+    ### Monitoring Endpoints
+    # metrics of the worker process handling the request (staff only)
+    path('metrics/', views.Metrics.as_view(), name='metrics'),
 ]
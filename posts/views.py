@@ -4,30 +4,100 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status
 from posts.models import Post, Comment
-from posts.serializers import PostSerializer, CommentSerializer, RegistrationSerializer
+from posts.serializers import (
+    PostSerializer, PostSummarySerializer, CommentSerializer, RegistrationSerializer, minimal_representation,
+)
 from rest_framework import permissions
 from .permissions import IsOwnerOrReadOnly
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework.authtoken.models import Token
+from . import metrics
+from .activity import comment_created, comment_deleted
+from .changes import changes_since
+from .deletion import hide_post
+from .events import comment_stream, hub
+from .export import async_chunks, export_records, ndjson_chunks, parse_since
+from .pagination import AuthorTimelinePagination
+from .preferences import prefers_minimal
+from .throttling import CommentRateThrottle, LoginRateThrottle, LoginUsernameRateThrottle, RegisterRateThrottle
+
+def write_response(request, serializer, status_code):
+    """
+    The response to a create or update: the full representation of the saved object, or with
+    `Prefer: return=minimal` (or ?return=minimal) only its id and the written fields
+    """
+    if prefers_minimal(request):
+        response = Response(minimal_representation(serializer), status=status_code)
+        response['Preference-Applied'] = 'return=minimal'
+        return response
+    return Response(serializer.data, status=status_code)
+
 
 class PostList(APIView):
     """
     List all posts or create a new post instance
 
     Methods:
-        GET:        Retrieve a list of all existing posts                                             Accessible by any user (Authenticated or Guest)
+        GET:        Retrieve a list of all existing posts with an excerpt of their text               Accessible by any user (Authenticated or Guest)
+                    (?body=full includes the complete text_content, ?ordering=activity puts
+                    the posts with the newest comments first)
+                    ?ids=1,2,3 instead returns these posts in full, in the requested order, and
+                    the ids that weren't found (at most MULTI_GET_MAX_IDS)
         POST:       Create a new post, automatically assigning the logged-in user as the author       Restricted to Authenticated users
+                    (Prefer: return=minimal or ?return=minimal only returns the id and the written fields)
     """
     # ensures that only logged-in users can POST (GET requests will still be handed to the guest user)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly] 
     def get(self, request):
         """Return a list of all posts"""
-        posts = Post.objects.all()
+        if 'ids' in request.query_params:
+            return self._get_many(request)
+        if request.query_params.get('body') == 'full':
+            posts = Post.objects.all()
+            serializer_class = PostSerializer
+        else:
+            # feeds only show the excerpt, so the (up to 4000 characters) text isn't selected at all
+            posts = Post.objects.defer('text_content')
+            serializer_class = PostSummarySerializer
+        if request.query_params.get('ordering') == 'activity':
+            # served by the post_activity_idx index, the id breaks ties between equal timestamps
+            posts = posts.order_by('-last_activity_at', '-id')
+        else:
+            # without an explicit order the database may walk any index, e.g. the activity one
+            posts = posts.order_by('id')
         # serialization: (object -> json)
-        serializer = PostSerializer(posts, many=True)
+        serializer = serializer_class(posts, many=True)
         # return the json data to the user
         return Response(serializer.data)
 
+    def _get_many(self, request):
+        """Return the posts of ?ids= like the PostDetail would, with one query for the posts and one for their comments"""
+        try:
+            # duplicates are returned once
+            ids = list(dict.fromkeys(int(pk) for pk in request.query_params['ids'].split(',') if pk.strip()))
+        except ValueError:
+            return Response({'detail': 'ids must be a comma separated list of integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.MULTI_GET_MAX_IDS:
+            return Response(
+                {'detail': f'At most {settings.MULTI_GET_MAX_IDS} ids can be requested at once.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        posts = (
+            Post.objects.select_related('author')
+            .prefetch_related(Prefetch('comments', queryset=Comment.objects.select_related('author')))
+            .in_bulk(ids)
+        )
+        serializer = PostSerializer([posts[pk] for pk in ids if pk in posts], many=True)
+        return Response({'results': serializer.data, 'missing': [pk for pk in ids if pk not in posts]})
+
     def post(self, request):
         """Create a new post with the provided data and authenticated user"""
         # deserialization: (json -> object)
@@ -40,7 +110,7 @@ class PostList(APIView):
         # the json doesn't include the autor, so we 'inject' the logged-in user here
         # this ensures the post is linked to the right person safely and automatically
         serializer.save(author=request.user)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return write_response(request, serializer, status.HTTP_201_CREATED)
 
 
 class PostDetail(APIView):
@@ -68,7 +138,7 @@ class PostDetail(APIView):
         serializer.is_valid(raise_exception=True)
 
         serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return write_response(request, serializer, status.HTTP_200_OK)
 
     # update only specific fields
     def patch(self, request, pk):
@@ -78,12 +148,12 @@ class PostDetail(APIView):
         serializer.is_valid(raise_exception=True)
 
         serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return write_response(request, serializer, status.HTTP_200_OK)
 
-    # remove the post from the database
+    # hide the post right away, the purge worker removes it and its comments in batches later
     def delete(self, request, pk):
         post = self._get_object(pk)
-        post.delete()
+        hide_post(post)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -95,9 +165,12 @@ class CommentList(APIView):
         GET:        Retrieve a list of all comments linked to a specific post    Accessible by any user (Authenticated or Guest)
         POST:       Create a new comment for a post, assigning the logged-in
                     user as the author and linking the post automatically        Restricted to Authenticated users
+                    (Prefer: return=minimal like on the PostList)
     """
     # ensures that only logged-in users can POST (GET requests will still be handed to the guest user)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly] 
+    # only POST is throttled, per user
+    throttle_classes = [CommentRateThrottle]
     def get(self, request, post_pk):
         """
         Return a list of all comments belonging to a specific post
@@ -127,8 +200,51 @@ class CommentList(APIView):
         # validation check for model requirements
         serializer.is_valid(raise_exception=True)
 
-        serializer.save(author=request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # the comment and the counters of its post are saved together or not at all
+        with transaction.atomic():
+            comment = serializer.save(author=request.user)
+            comment_created(comment)
+            # stream clients only hear about the comment once it is committed
+            transaction.on_commit(lambda: hub.publish_comment(comment))
+        return write_response(request, serializer, status.HTTP_200_OK)
+
+
+class CommentStream(View):
+    """
+    Pushes the new comments of a post as server-sent events, instead of clients polling the CommentList
+
+    Methods:
+        GET:        Stream the new comments as `comment` events with the comment id as event id           Accessible by any user (Authenticated or Guest)
+                    (Last-Event-ID header or ?last_event_id=: the comments after that id come first).
+                    A client that loaded the comments from the CommentList passes the newest id it got
+                    as ?last_event_id=, so comments written before the stream connected aren't lost.
+                    Without an id the stream starts at the newest comment at connect time.
+
+    Only served by the ASGI application (config/asgi.py), where an idle client costs no thread.
+    """
+    async def get(self, request, post_pk):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'detail': 'The comment stream is only served by the ASGI application.'}, status=501)
+
+        last_event_id = request.headers.get('Last-Event-ID', request.GET.get('last_event_id'))
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                return JsonResponse({'detail': 'Last-Event-ID must be a comment id.'}, status=400)
+
+        if not await Post.objects.filter(pk=post_pk).aexists():
+            return JsonResponse({'detail': 'No Post matches the given query.'}, status=404)
+        if hub.count() >= settings.COMMENT_STREAM['MAX_SUBSCRIBERS']:
+            response = JsonResponse({'detail': 'Too many stream clients, try again later.'}, status=503)
+            response['Retry-After'] = '30'
+            return response
+
+        response = StreamingHttpResponse(comment_stream(post_pk, last_event_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx would otherwise buffer the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class CommentDetail(APIView):
@@ -137,13 +253,15 @@ class CommentDetail(APIView):
 
     Methods:
         PATCH:      Update specific fields of a comment (e.g., the text)
+                    (Prefer: return=minimal like on the PostList)
         DELETE:     Remove the comment from the database
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
     def _get_object(self, pk):
         """Helper method to find the post and check permissions"""
-        comment = get_object_or_404(Comment, pk=pk)
+        # comments of deleted posts are gone for the user, even while they wait for the purge
+        comment = get_object_or_404(Comment, pk=pk, parent_post__deleted_at__isnull=True)
         self.check_object_permissions(self.request, comment)
         return comment
 
@@ -159,7 +277,7 @@ class CommentDetail(APIView):
         serializer.is_valid(raise_exception=True)
 
         serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return write_response(request, serializer, status.HTTP_200_OK)
 
     def delete(self, request, pk):
         """
@@ -169,10 +287,52 @@ class CommentDetail(APIView):
             pk (int):   The primary key of the comment to remove
         """
         comment = self._get_object(pk)
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            comment_deleted(comment)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class UserPostList(APIView):
+    """
+    List the posts of one user, newest first
+
+    Methods:
+        GET:        Retrieve a page of the user's posts with an excerpt of their text                 Accessible by any user (Authenticated or Guest)
+                    (?cursor= from the next/previous links, ?page_size= up to 100)
+    """
+    def get(self, request, username):
+        user = get_object_or_404(User, username=username)
+        # the related manager is based on the default manager, so deleted posts are left out
+        posts = (
+            user.posts.defer('text_content')
+            .select_related('author')
+            .prefetch_related(Prefetch('comments', queryset=Comment.objects.select_related('author')))
+        )
+        paginator = AuthorTimelinePagination()
+        page = paginator.paginate_queryset(posts, request, view=self)
+        serializer = PostSummarySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class UserCommentList(APIView):
+    """
+    List the comments of one user, newest first
+
+    Methods:
+        GET:        Retrieve a page of the user's comments                                            Accessible by any user (Authenticated or Guest)
+                    (?cursor= from the next/previous links, ?page_size= up to 100)
+    """
+    def get(self, request, username):
+        user = get_object_or_404(User, username=username)
+        # comments of deleted posts are gone for the user, even while they wait for the purge
+        comments = user.comment_set.filter(parent_post__deleted_at__isnull=True).select_related('author')
+        paginator = AuthorTimelinePagination()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        serializer = CommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
 class AuthenticationLogin(APIView):
     """
     Authenticate a user and return a unique token
@@ -180,6 +340,9 @@ class AuthenticationLogin(APIView):
     Methods:
         POST:       Validate credentials and return a new API token (replaces any existing token)
     """
+    # every attempt costs a password hash, limit them per IP and per attacked username
+    throttle_classes = [LoginRateThrottle, LoginUsernameRateThrottle]
+
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
@@ -202,6 +365,8 @@ class Register(APIView):
     Methods:
         POST:       Create a new user instance and automatically generate an authentication token
     """
+    throttle_classes = [RegisterRateThrottle]
+
     def post(self, request):
         serializer = RegistrationSerializer(data=request.data)
 
@@ -212,3 +377,65 @@ class Register(APIView):
             return Response({"user": serializer.data, "token": token.key}, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ChangeList(APIView):
+    """
+    Delta sync: the posts and comments created, updated or deleted after a token
+
+    Methods:
+        GET:        Retrieve the changes after ?since= (0 or nothing for all of them) in the order   Accessible by any user (Authenticated or Guest)
+                    they happened, with the current data of created/updated objects.
+                    Pass `next` as ?since= until `has_more` is false (?limit= up to MAX_PAGE_SIZE)
+    """
+    def get(self, request):
+        config = settings.CHANGE_FEED
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', config['PAGE_SIZE']))
+        except ValueError:
+            return Response({'detail': 'since and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({'detail': 'since and limit must not be negative.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes, next_token, has_more = changes_since(since, min(limit, config['MAX_PAGE_SIZE']))
+        return Response({'changes': changes, 'next': next_token, 'has_more': has_more}, status=status.HTTP_200_OK)
+
+
+class Export(APIView):
+    """
+    Stream every visible post with its comments and author usernames as NDJSON, one post per line
+
+    Methods:
+        GET:        Stream the export (?since= an ISO date or datetime limits it to the posts         Restricted to staff users
+                    created or commented on since then), compressed per Accept-Encoding
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        try:
+            since = parse_since(since) if since else None
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # a full export can outlast the worker timeout, snapshots of a big site belong to manage.py export_posts
+        chunks = ndjson_chunks(export_records(since))
+        if isinstance(request._request, ASGIRequest):
+            # django would read a synchronous iterator to the end before sending anything
+            chunks = async_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="posts.ndjson"'
+        return response
+
+
+class Metrics(APIView):
+    """
+    Expose the performance metrics of the worker process that handles the request
+
+    Methods:
+        GET:        Return database pool statistics (wait time, saturation) of this worker       Restricted to staff users
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot(), status=status.HTTP_200_OK)
@@ -0,0 +1,8 @@
+# words that pass the profanity filter, even when glued together (it matches substrings).
+# generate_data and the benchmarks build their texts from them, so this module must not import django
+VOCABULARY = (
+    'lorem ipsum dolor sit amet consectetur elit sed do eiusmod tempor incididunt ut labore et dolore '
+    'magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea '
+    'commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla '
+    'pariatur excepteur sint occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est'
+).split()
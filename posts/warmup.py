@@ -0,0 +1,99 @@
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth import hashers, password_validation
+from django.db import connections
+from django.urls import get_resolver, resolve, reverse
+from django.urls.converters import IntConverter
+from django.utils import translation
+from rest_framework.settings import api_settings
+
+from . import urls
+from .sanitization import strip_tags
+from .serializers import (
+    CommentSerializer, PostSerializer, PostSummarySerializer, ProfanityValidator, RegistrationSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+SERIALIZERS = (PostSerializer, PostSummarySerializer, CommentSerializer, RegistrationSerializer)
+
+
+def warm_urls():
+    """Builds the resolver's lookup tables and resolves every named url once"""
+    get_resolver().reverse_dict
+    for pattern in urls.urlpatterns:
+        kwargs = {
+            name: 1 if isinstance(converter, IntConverter) else 'warmup'
+            for name, converter in pattern.pattern.converters.items()
+        }
+        resolve(reverse(pattern.name, kwargs=kwargs))
+
+
+def warm_serializers():
+    """Constructs the fields of every serializer (model field lookups, validators, error messages)"""
+    for serializer_class in SERIALIZERS:
+        serializer_class().fields
+    # runs the profanity filter and the sanitizer without touching the database
+    PostSerializer(data={'title': 'Warmup', 'text_content': '<p>Warming up the serializers</p>'}).is_valid()
+
+
+def warm_validators():
+    """Loads the word lists of the profanity filter and of django's common password validator"""
+    ProfanityValidator()('warmup')
+    strip_tags('<b>warmup</b>')
+    # CommonPasswordValidator reads a compressed list of 20k passwords when it is created
+    password_validation.get_default_password_validators()
+    hashers.get_hashers()
+
+
+def warm_framework():
+    """Imports DRF's lazily loaded classes and the translation catalogs of the error messages"""
+    for name in (
+        'DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+        'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    ):
+        getattr(api_settings, name)
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('This field is required.')
+
+
+def warm_databases():
+    """
+    Makes sure every database is reachable, then closes the connections again
+
+    A socket must never be shared by forked workers, each one connects on its first query.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+        connection.close()
+        # a connection pool (postgres with OPTIONS['pool']) holds connections and threads of its own
+        close_pool = getattr(connection, 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
+
+
+STEPS = (
+    ('urls', warm_urls),
+    ('serializers', warm_serializers),
+    ('validators', warm_validators),
+    ('framework', warm_framework),
+    ('databases', warm_databases),
+)
+
+
+def warm_up():
+    """
+    Loads everything a worker would otherwise load lazily on its first requests, returns the seconds per step
+
+    Meant to run in the gunicorn master before it forks (see gunicorn.conf.py): the workers then
+    share the warmed up state copy-on-write instead of building it themselves while a client waits.
+    """
+    timings = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    logger.info('Warmup done in %.3fs', sum(timings.values()))
+    return timings